@@ -0,0 +1,197 @@
+"""
+Concurrent batch generation of interview question sets.
+
+Each spec is a dict of keyword arguments for one of the generators. Specs that
+contain a `job_description` go to `question_generator_for_ui`, the rest to
+`question_generator_gemini`. Example:
+
+    python batch_gen.py roles.csv -o results.jsonl --concurrency 8 --rpm 60
+"""
+import argparse
+import asyncio
+import contextvars
+import csv
+import functools
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from question_gen import question_generator_gemini
+from question_gen2 import question_generator_for_ui
+
+SKILLS_FIELDS = ("rol", "level", "level_description", "type", "responsibilities",
+                 "technical_skills", "soft_skills", "language", "n", "bypass_cache", "output_format",
+                 "use_bank", "fan_out")
+JOB_DESCRIPTION_FIELDS = ("job_description", "role", "level", "previous_experience",
+                          "question_type", "language", "n", "bypass_cache", "output_format", "fan_out",
+                          "token_budget")
+
+
+@dataclass
+class BatchResult:
+    index: int
+    spec: dict
+    text: str = None
+    questions: list = None
+    error: str = None
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = {"index": self.index, "spec": self.spec, "text": self.text,
+                "error": self.error, "elapsed": round(self.elapsed, 3)}
+        if self.questions is not None:
+            data["questions"] = [q.to_dict() for q in self.questions]
+        return data
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter allowing at most `per_minute` acquisitions in any 60 second window.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.per_minute <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= 60:
+                    self._calls.popleft()
+                if len(self._calls) < self.per_minute:
+                    self._calls.append(now)
+                    return
+                await asyncio.sleep(60 - (now - self._calls[0]))
+
+
+def _prepare_call(spec: dict):
+    """
+    Picks the generator for a spec and keeps only the arguments it accepts.
+    """
+    from_job_description = bool(spec.get("job_description"))
+    if from_job_description:
+        func, fields = question_generator_for_ui, JOB_DESCRIPTION_FIELDS
+    else:
+        func, fields = question_generator_gemini, SKILLS_FIELDS
+    kwargs = {key: spec[key] for key in fields if spec.get(key) not in (None, "")}
+    for number in ("n", "token_budget"):
+        if number in kwargs:
+            kwargs[number] = int(kwargs[number])
+    for flag in ("bypass_cache", "use_bank", "fan_out"):
+        if flag in kwargs and isinstance(kwargs[flag], str):
+            kwargs[flag] = kwargs[flag].strip().lower() in ("1", "true", "yes")
+    if not from_job_description:
+        kwargs.setdefault("language", "English")
+        for key in ("level_description", "responsibilities", "technical_skills", "soft_skills"):
+            kwargs.setdefault(key, "")
+    return func, kwargs
+
+
+async def _run_one(index, spec, semaphore, limiter, executor) -> BatchResult:
+    result = BatchResult(index=index, spec=spec)
+    async with semaphore:
+        await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            func, kwargs = _prepare_call(spec)
+            call = functools.partial(contextvars.copy_context().run, func, **kwargs)
+            output = await asyncio.get_running_loop().run_in_executor(executor, call)
+            if isinstance(output, list):
+                result.questions = output
+            else:
+                result.text = output
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def generate_batch(specs, max_concurrency: int = 5, requests_per_minute: int = 60):
+    """
+    Generates question sets for many specs concurrently.
+
+    Parameters:
+        - specs: Iterable of generator keyword-argument dicts.
+        - max_concurrency: Maximum number of requests in flight at once.
+        - requests_per_minute: Upstream rate budget; 0 disables rate limiting.
+
+    Yields:
+        - BatchResult objects in completion order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    # One thread per request in flight: the loop's default executor (min(32, CPUs + 4) threads)
+    # would silently cap max_concurrency on small machines
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="qg-batch")
+    tasks = [asyncio.create_task(_run_one(i, spec, semaphore, limiter, executor)) for i, spec in enumerate(specs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False)
+
+
+def run_batch(specs, max_concurrency: int = 5, requests_per_minute: int = 60) -> list:
+    """
+    Synchronous wrapper around generate_batch. Returns results in input order.
+    """
+    async def collect():
+        return [r async for r in generate_batch(specs, max_concurrency, requests_per_minute)]
+
+    return sorted(asyncio.run(collect()), key=lambda r: r.index)
+
+
+def load_specs(path: str) -> list:
+    """
+    Reads specs from a CSV file (one row per role, header names match generator arguments)
+    or from a JSONL file (one object per line).
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+async def _main_async(args):
+    specs = load_specs(args.input)
+    for spec in specs:
+        spec.setdefault("output_format", args.format)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    start = time.perf_counter()
+    try:
+        async for result in generate_batch(specs, args.concurrency, args.rpm):
+            failures += result.error is not None
+            out.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"[{result.index}] {'failed' if result.error else 'done'} in {result.elapsed:.1f}s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(specs)} specs, {failures} failed, {time.perf_counter() - start:.1f}s total", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate interview question sets for many roles concurrently.")
+    parser.add_argument("input", help="CSV or JSONL file with one spec per row")
+    parser.add_argument("-o", "--output", help="JSONL file for results (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=5, help="maximum requests in flight")
+    parser.add_argument("--format", choices=("text", "json"), default="text",
+                        help="default output format for specs that do not set one")
+    parser.add_argument("--rpm", type=int, default=60, help="maximum requests per minute (0 = unlimited)")
+    args = parser.parse_args(argv)
+    return asyncio.run(_main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
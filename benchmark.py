@@ -0,0 +1,294 @@
+"""
+Offline benchmark suite. Runs against FakeBackend, needs no API key or network.
+
+    python benchmark.py                          # run and print a table
+    python benchmark.py --save baseline.json     # store results
+    python benchmark.py --compare baseline.json  # exit 1 if a case got slower than allowed
+
+Each case is timed in several rounds after calibration; the median time per call is
+what comparisons use, as it is the least sensitive to noisy CI machines. Saved results
+include the prompt template versions, so a comparison across a template change is flagged.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Keep benchmark runs away from the real response cache
+os.environ.setdefault("QG_CACHE_DIR", tempfile.mkdtemp(prefix="qg-bench-"))
+
+import gemini_client
+import prompt_templates
+from fake_backend import FakeBackend
+
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def _sample_questions(n=10):
+    backend = FakeBackend()
+    return backend.render(f"Generate exactly {n} questions", {"response_mime_type": "application/json"})
+
+
+def _sample_text(n=10, with_code=True):
+    from question_models import parse_questions, questions_to_lines
+    questions = parse_questions(_sample_questions(n))
+    if not with_code:
+        for q in questions:
+            q.code = None
+    return "\n".join(questions_to_lines(questions))
+
+
+def _sample_events(n=10, with_code=True):
+    from question_parser import parse
+    return parse(_sample_text(n, with_code))
+
+
+LONG_JOB_DESCRIPTION = "\n".join(
+    f"- Responsibility {i}: build and maintain data pipelines, dashboards and SQL models." for i in range(150)
+)
+
+
+@case("prompt_build_skills")
+def bench_prompt_skills():
+    from question_gen import build_prompt
+    return lambda: build_prompt("Data Analyst", "Junior", "1 year", "Technique", "Reporting, cleaning",
+                                "SQL, Python", "Communication", "English", 10)
+
+
+@case("prompt_build_job_description")
+def bench_prompt_job_description():
+    from question_gen2 import build_prompt
+    return lambda: build_prompt(LONG_JOB_DESCRIPTION, "Data Engineer", "Senior", "6 years", "technical", "English", 10)
+
+
+@case("compact_job_description_150_lines")
+def bench_compact_job_description():
+    from prompt_compaction import compact_job_description
+    # Bypass the memo so every call does the full pass
+    return lambda: compact_job_description.__wrapped__(LONG_JOB_DESCRIPTION, 400)
+
+
+@case("parse_json_10_questions")
+def bench_parse_json():
+    from question_models import parse_questions
+    text = _sample_questions(10)
+    return lambda: parse_questions(text, expected=10)
+
+
+@case("parse_text_10_questions")
+def bench_parse_text():
+    from question_parser import parse
+    text = _sample_text(10)
+    return lambda: parse(text)
+
+
+@case("parse_text_10_questions_streamed")
+def bench_parse_streamed():
+    from question_parser import IncrementalParser
+    text = _sample_text(10)
+    chunks = [text[i:i + 40] for i in range(0, len(text), 40)]  # roughly one streamed chunk per 10 tokens
+
+    def run():
+        parser = IncrementalParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.close()
+    return run
+
+
+@case("route_check_text_10_questions")
+def bench_route_check():
+    from model_router import RouteRequest, check_text
+    text = _sample_text(10)
+    request = RouteRequest(question_type="Technique", n=10, language="English", requires_code=True)
+    return lambda: check_text(text, request)
+
+
+@case("export_txt_10_questions")
+def bench_export_txt():
+    from exporters import export_txt
+    events = _sample_events(10)
+    return lambda: export_txt(events)
+
+
+@case("pdf_export_text_only")
+def bench_pdf_text():
+    from pdf_export import render_questions_to_pdf
+    events = _sample_events(10, with_code=False)
+    return lambda: render_questions_to_pdf(events)
+
+
+@case("pdf_export_with_code")
+def bench_pdf_code():
+    from pdf_export import render_questions_to_pdf
+    events = _sample_events(10, with_code=True)
+    return lambda: render_questions_to_pdf(events)
+
+
+def _sample_snippets(n=10):
+    from question_models import parse_questions
+    return [(q.code.code, q.code.language) for q in parse_questions(_sample_questions(n)) if q.code]
+
+
+@case("highlight_10_snippets_uncached")
+def bench_highlight_uncached():
+    import highlighting
+    snippets = [(code, highlighting.code_language(tag)) for code, tag in _sample_snippets(10)]
+    return lambda: [highlighting._tokenize(code, language) for code, language in snippets]
+
+
+@case("highlight_10_snippets_cached")
+def bench_highlight_cached():
+    from highlighting import highlight
+    snippets = _sample_snippets(10)
+    return lambda: [highlight(code, tag) for code, tag in snippets]
+
+
+@case("history_search_5000_questions")
+def bench_history_search():
+    from history import HistoryStore
+    from question_models import parse_questions, questions_to_lines
+    from question_parser import parse
+    store = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="qg-bench-history-"), "history.sqlite3"))
+    for i in range(500):
+        questions = parse_questions(_sample_questions(10))
+        for q in questions:
+            q.text = f"{q.text} (set {i})"
+        text = "\n".join(questions_to_lines(questions))
+        store.record(text, parse(text), questions, role=f"Role {i % 50}", level="Mid", question_type="Technique",
+                     language="English", n=10)
+    return lambda: (store.search("sql"), store.search(role="Role 7"), store.search("sql", before=2500))
+
+
+@case("generate_text_uncached")
+def bench_generate():
+    from question_gen import question_generator_gemini
+    return lambda: question_generator_gemini("Data Analyst", "Junior", "", "Technique", "", "SQL", "", "English",
+                                             n=10, bypass_cache=True)
+
+
+@case("generate_text_cached")
+def bench_generate_cached():
+    from question_gen import question_generator_gemini
+    args = ("Data Analyst", "Junior", "", "Technique", "", "SQL", "", "English")
+    question_generator_gemini(*args, n=10)
+    return lambda: question_generator_gemini(*args, n=10)
+
+
+@case("generate_fan_out_10_uncached")
+def bench_generate_fan_out():
+    from question_gen import question_generator_gemini
+    return lambda: question_generator_gemini("Data Analyst", "Junior", "", "Technique", "Reporting", "SQL, Python",
+                                             "Communication", "English", n=10, bypass_cache=True,
+                                             output_format="json", fan_out=True)
+
+
+@case("batch_50_specs_concurrency_10")
+def bench_batch():
+    from batch_gen import run_batch
+    specs = [{"rol": f"Role {i}", "level": "Mid", "type": "Technique", "technical_skills": "SQL",
+              "n": 5, "bypass_cache": True} for i in range(50)]
+
+    def run():
+        previous = gemini_client.set_backend(FakeBackend(latency=0.05))
+        try:
+            run_batch(specs, max_concurrency=10, requests_per_minute=0)
+        finally:
+            gemini_client.set_backend(previous)
+    return run
+
+
+def measure(fn, rounds: int = 5, min_round_time: float = 0.05) -> dict:
+    """
+    Calibrates the number of calls per round so a round lasts at least `min_round_time`,
+    then times `rounds` rounds and reports per-call statistics in seconds.
+    """
+    fn()  # warm-up
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, int(min_round_time / elapsed) + 1)
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - start) / iterations)
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "min": min(per_call),
+        "median": statistics.median(per_call),
+        "mean": statistics.fmean(per_call),
+        "stdev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+    }
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("-k", "--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="fail when a median exceeds baseline * this factor (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    gemini_client.set_backend(FakeBackend())
+    results = {}
+    for name, factory in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(factory(), rounds=args.rounds)
+        r = results[name]
+        print(f"{name:<34} median {_format_seconds(r['median']):>10}   min {_format_seconds(r['min']):>10}"
+              f"   ±{_format_seconds(r['stdev']):>10}   ({r['iterations']} x {r['rounds']})")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"templates": prompt_templates.versions(), "cases": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = saved.get("cases", saved)  # baselines saved before template versions were recorded
+        if saved.get("templates", {}) != prompt_templates.versions():
+            print("NOTE prompt templates changed since the baseline; prompt-dependent cases may differ",
+                  file=sys.stderr)
+        regressions = []
+        for name, r in results.items():
+            if name in baseline:
+                ratio = r["median"] / baseline[name]["median"]
+                if ratio > args.max_regression:
+                    regressions.append(f"{name}: {ratio:.2f}x slower than baseline")
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
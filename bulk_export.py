@@ -0,0 +1,212 @@
+"""
+Bulk export of batch results: one document per question set plus a combined booklet,
+rendered in parallel across cores and streamed into a single zip archive.
+The booklet is rendered in parts, one per worker, and the parts are merged at the end,
+so it scales with the workers like the per-set documents.
+
+    python batch_gen.py roles.csv -o results.jsonl
+    python bulk_export.py results.jsonl -o questions.zip --workers 8
+
+Each worker process loads the common Pygments lexers, code style and token colors once
+(in its initializer) and reuses them for every document it renders; highlighted snippets
+are shared between workers through the highlighting disk cache. Finished documents are
+written straight into the zip, without per-file temp files.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from exporters import EXPORT_FORMATS
+from question_models import parse_questions, questions_to_lines
+from question_parser import parse
+
+BOOKLET_NAME = "booklet.pdf"
+BOOKLET_MIN_SECTIONS = 4  # sets per booklet part at least: each part repeats the PDF overhead (fonts, catalog)
+MANIFEST_NAME = "manifest.json"
+
+
+def _slug(text: str, max_length: int = 40) -> str:
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_text.lower()).strip("-")[:max_length] or "set"
+
+
+def load_results(path: str) -> list:
+    """
+    Reads a batch_gen JSONL output file.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _result_events(result: dict) -> list:
+    if result.get("questions"):
+        return parse("\n".join(questions_to_lines(parse_questions(json.dumps(result["questions"])))))
+    return parse(result.get("text") or "")
+
+
+def _heading(result: dict) -> str:
+    spec = result.get("spec") or {}
+    role = spec.get("rol") or spec.get("role") or f"Set {result.get('index', '')}"
+    return f"{role} ({spec['level']})" if spec.get("level") else role
+
+
+def prepare_documents(results, fmt: str = "pdf") -> tuple:
+    """
+    Turns batch results into render jobs.
+
+    Returns:
+        - (jobs, skipped): jobs are (file name, heading, events) tuples; skipped lists the failed results.
+    """
+    jobs, skipped = [], []
+    for position, result in enumerate(results):
+        if result.get("error") or not (result.get("questions") or result.get("text")):
+            skipped.append({"index": result.get("index", position), "error": result.get("error")})
+            continue
+        spec = result.get("spec") or {}
+        index = result.get("index", position)
+        name = f"{index:04d}-{_slug(spec.get('rol') or spec.get('role'))}-{_slug(spec.get('level'))}.{fmt}"
+        jobs.append((name, _heading(result), _result_events(result)))
+    return jobs, skipped
+
+
+def _init_worker():
+    """
+    Loads the rendering resources once per worker process.
+    """
+    import highlighting
+    import pdf_export
+    from pygments.token import Token
+    pdf_export._unicode_font_available()
+    highlighting.token_style(Token)
+    for tag in (highlighting.DEFAULT_LANGUAGE, "sql", "java", "javascript", "bash"):
+        highlighting.get_lexer(tag)
+
+
+def _render_document(fmt: str, name: str, events: list) -> tuple:
+    return name, EXPORT_FORMATS[fmt].render(events)
+
+
+def _render_booklet_part(part: int, sections: list) -> tuple:
+    from pdf_export import TITLE, render_booklet_to_pdf
+    return part, render_booklet_to_pdf(sections, title=TITLE if part == 0 else None)
+
+
+def _booklet_parts(sections: list, workers: int) -> list:
+    """
+    Splits the booklet's sections into up to `workers` consecutive parts of similar size.
+    """
+    count = max(1, min(workers, len(sections) // BOOKLET_MIN_SECTIONS))
+    size, extra = divmod(len(sections), count)
+    parts, start = [], 0
+    for index in range(count):
+        end = start + size + (index < extra)
+        parts.append(sections[start:end])
+        start = end
+    return parts
+
+
+def export_zip(results, output, fmt: str = "pdf", workers: int = None, booklet: bool = True,
+               progress=None) -> dict:
+    """
+    Renders every successful result into `output` (a path or a writable binary file).
+
+    Parameters:
+        - results: Dicts as written by batch_gen (index, spec, text or questions, error).
+        - output: Zip file path or binary file object.
+        - fmt: Per-set document format, one of exporters.EXPORT_FORMATS.
+        - workers: Worker processes (default: os.cpu_count()).
+        - booklet: Also render all sets into one booklet.pdf.
+        - progress: Optional callable receiving each finished file name.
+
+    Returns:
+        - The manifest written into the archive as manifest.json.
+    """
+    jobs, skipped = prepare_documents(results, fmt)
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4  # documents rendering or waiting to be zipped at any time
+    pending_jobs = iter(jobs)
+    files = []
+    booklet_parts = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+            zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        in_flight = set()
+        booklet_futures = set()
+        if booklet and jobs:
+            # The booklet is the largest document: start its parts first so they overlap the rest
+            sections = [(heading, events) for _, heading, events in jobs]
+            booklet_futures = {pool.submit(_render_booklet_part, part, part_sections)
+                               for part, part_sections in enumerate(_booklet_parts(sections, workers))}
+            in_flight |= booklet_futures
+
+        def fill():
+            while len(in_flight) < window:
+                job = next(pending_jobs, None)
+                if job is None:
+                    return
+                name, _, events = job
+                in_flight.add(pool.submit(_render_document, fmt, name, events))
+
+        fill()
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in booklet_futures:
+                    part, data = future.result()
+                    booklet_parts[part] = data
+                    continue
+                name, data = future.result()
+                # PDFs are already compressed; deflating them again costs CPU for nothing
+                archive.writestr(name, data,
+                                 compress_type=zipfile.ZIP_STORED if name.endswith(".pdf") else None)
+                files.append({"name": name, "bytes": len(data)})
+                if progress:
+                    progress(name)
+            fill()
+
+        if booklet_parts:
+            from pdf_export import merge_pdfs
+            parts = [booklet_parts[part] for part in sorted(booklet_parts)]
+            data = parts[0] if len(parts) == 1 else merge_pdfs(parts)
+            archive.writestr(BOOKLET_NAME, data, compress_type=zipfile.ZIP_STORED)
+            files.append({"name": BOOKLET_NAME, "bytes": len(data)})
+            if progress:
+                progress(BOOKLET_NAME)
+
+        manifest = {
+            "format": fmt,
+            "documents": sorted(files, key=lambda f: f["name"]),
+            "skipped": skipped,
+            "workers": workers,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, ensure_ascii=False))
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render batch_gen results into a zip of documents.")
+    parser.add_argument("input", help="JSONL file written by batch_gen.py")
+    parser.add_argument("-o", "--output", default="interview_questions.zip", help="zip file to write")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="pdf", help="per-set document format")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--no-booklet", action="store_true", help="skip the combined booklet.pdf")
+    args = parser.parse_args(argv)
+
+    results = load_results(args.input)
+    manifest = export_zip(results, args.output, fmt=args.format, workers=args.workers,
+                          booklet=not args.no_booklet, progress=lambda name: print(name, file=sys.stderr))
+    print(f"{len(manifest['documents'])} documents, {len(manifest['skipped'])} skipped, "
+          f"{manifest['seconds']:.1f}s with {manifest['workers']} workers -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+
+from highlighting import highlight
+from pdf_export import TITLE, render_questions_to_pdf
+from question_parser import CODE, HEADING, QUESTION, TEXT, parse
+from response_cache import CACHE_DIR, DEFAULT_TTL, ResponseCache
+
+import docx
+from docx.shared import Pt, RGBColor
+
+ARTIFACT_MAX_ENTRIES = int(os.getenv("QG_ARTIFACT_MAX_ENTRIES", 500))
+
+ExportFormat = namedtuple("ExportFormat", ["label", "extension", "mime", "render"])
+
+
+def content_hash(text: str) -> str:
+    """
+    Key for export artifacts: identical generated text always maps to the same artifacts.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _plain(line: str) -> str:
+    return line.replace("**", "").strip()
+
+
+def export_txt(events) -> bytes:
+    lines = [TITLE, ""]
+    for event in events:
+        if event.kind == QUESTION:
+            if lines[-1]:
+                lines.append("")
+        elif event.kind == CODE:
+            lines.append(event.text)
+        else:
+            lines.append(_plain(event.text))
+    return "\n".join(lines).strip().encode("utf-8") + b"\n"
+
+
+def export_markdown(events) -> bytes:
+    lines = [f"# {TITLE}", ""]
+    for event in events:
+        if event.kind == CODE:
+            lines.extend([f"```{event.language or ''}", event.text, "```", ""])
+        elif event.kind == HEADING:
+            lines.extend([f"{'#' * event.level} {event.text}", ""])
+        elif event.kind == TEXT:
+            # Blank line between text lines so each renders as its own paragraph
+            lines.extend([event.text, ""])
+    return "\n".join(lines).strip().encode("utf-8") + b"\n"
+
+
+def _add_code(document, code: str, language: str):
+    """
+    Adds a code block as one paragraph of colored runs, from the same memoized
+    highlighting as the PDF export.
+    """
+    paragraph = document.add_paragraph()
+    for value, r, g, b, bold in highlight(code, language):
+        run = paragraph.add_run(value)
+        run.font.name = "Courier New"
+        run.font.size = Pt(9)
+        run.font.color.rgb = RGBColor(r, g, b)
+        run.font.bold = bold
+
+
+def export_docx(events) -> bytes:
+    document = docx.Document()
+    document.add_heading(TITLE, level=1)
+    for event in events:
+        if event.kind == CODE:
+            _add_code(document, event.text, event.language)
+        elif event.kind == HEADING:
+            document.add_heading(_plain(event.text), level=min(event.level + 1, 9))
+        elif event.kind == TEXT:
+            document.add_paragraph(_plain(event.text))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "pdf": ExportFormat("PDF", "pdf", "application/pdf", render_questions_to_pdf),
+    "txt": ExportFormat("TXT", "txt", "text/plain", export_txt),
+    "md": ExportFormat("Markdown", "md", "text/markdown", export_markdown),
+    "docx": ExportFormat("DOCX", "docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                         export_docx),
+}
+
+
+def export(text: str, fmt: str, events: list = None) -> bytes:
+    """
+    Renders generated question text in one of EXPORT_FORMATS.
+
+    Parameters:
+        - text: The generated text.
+        - fmt: Key of EXPORT_FORMATS.
+        - events: The text already parsed by question_parser.parse, to skip parsing it again.
+    """
+    return EXPORT_FORMATS[fmt].render(parse(text) if events is None else events)
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ResponseCache:
+    """
+    Returns the persistent store of rendered artifacts (CACHE_DIR/artifacts.sqlite3), keyed by
+    format and content hash, with the response cache's TTL. prewarm.py fills it ahead of time.
+    """
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                _artifact_store = ResponseCache(os.path.join(CACHE_DIR, "artifacts.sqlite3"), ttl=DEFAULT_TTL,
+                                                max_entries=ARTIFACT_MAX_ENTRIES)
+    return _artifact_store
+
+
+def stored_export(text: str, fmt: str, events: list = None) -> bytes:
+    """
+    Like export, but serves artifacts already in the artifact store and stores new ones,
+    so an artifact rendered once, by any process, is not rendered again.
+    """
+    store = get_artifact_store()
+    key = f"{fmt}:{content_hash(text)}"
+    data = store.get(key)
+    if data is None:
+        data = export(text, fmt, events)
+        store.set(key, data)
+    return data
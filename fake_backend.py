@@ -0,0 +1,189 @@
+"""
+Deterministic, network-less stand-in for the Gemini backend.
+
+FakeBackend replays recorded responses: an exact recording for the prompt if one
+exists (see RecordingBackend), otherwise a response assembled from the recorded
+question pool in fixtures/recorded_questions.json, in text or JSON format and with
+the number of questions the prompt asks for. Latency, jitter and error rates are
+configurable, so the generators, cache, retries and batch engine can be exercised
+and benchmarked offline:
+
+    QG_BACKEND=fake QG_FAKE_LATENCY=0.8 streamlit run main_app.py
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from gemini_client import ModelBackend, estimate_tokens
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+QUESTION_POOL_PATH = os.path.join(FIXTURES_DIR, "recorded_questions.json")
+
+_COUNT_PATTERN = re.compile(r"Generate (?:exactly )?(\d+)")
+
+
+class FakeServiceError(Exception):
+    """
+    Injected failure carrying an HTTP status in `code`, like google.api_core errors.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def recording_key(prompt: str, system_instruction: str = None) -> str:
+    return prompt_hash(f"{system_instruction}\0{prompt}" if system_instruction else prompt)
+
+
+def _usage(prompt: str, text: str, system_instruction: str = None):
+    # Local estimate, good enough for relative measurements; like the API, the
+    # prompt count includes the system instruction
+    return SimpleNamespace(prompt_token_count=estimate_tokens(prompt) + estimate_tokens(system_instruction or ""),
+                           candidates_token_count=estimate_tokens(text))
+
+
+class FakeBackend(ModelBackend):
+    """
+    Parameters:
+        - latency: Mean seconds per response.
+        - jitter: Maximum +/- seconds added uniformly to the latency.
+        - error_rate: Probability that a call fails with a 503.
+        - rate_limit_rate: Probability that a call fails with a 429.
+        - recordings_path: Optional JSONL file of {"prompt_hash", "text"} entries to replay exactly.
+        - seed: Seed of the random generator, for reproducible runs.
+        - chunk_size: Characters per chunk in streaming mode.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, recordings_path: str = None, seed: int = 0,
+                 chunk_size: int = 80):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        with open(QUESTION_POOL_PATH, encoding="utf-8") as f:
+            self.pool = json.load(f)
+        self.recordings = {}
+        if recordings_path and os.path.exists(recordings_path):
+            with open(recordings_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["prompt_hash"]] = entry["text"]
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("QG_FAKE_LATENCY", 0)),
+            jitter=float(os.getenv("QG_FAKE_JITTER", 0)),
+            error_rate=float(os.getenv("QG_FAKE_ERROR_RATE", 0)),
+            rate_limit_rate=float(os.getenv("QG_FAKE_RATE_LIMIT_RATE", 0)),
+            recordings_path=os.getenv("QG_FAKE_RECORDINGS"),
+            seed=int(os.getenv("QG_FAKE_SEED", 0)),
+        )
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return delay, FakeServiceError(429, "Resource has been exhausted (fake)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, FakeServiceError(503, "Service unavailable (fake)")
+        return delay, None
+
+    def render(self, prompt: str, generation_config: dict = None, system_instruction: str = None) -> str:
+        """
+        Builds the response text for a prompt without any delay.
+        """
+        recorded = self.recordings.get(recording_key(prompt, system_instruction))
+        if recorded is not None:
+            return recorded
+
+        match = _COUNT_PATTERN.search(prompt)
+        n = int(match.group(1)) if match else 5
+        start = int(prompt_hash(prompt)[:8], 16) % len(self.pool)
+        items = [self.pool[(start + i) % len(self.pool)] for i in range(n)]
+
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            return json.dumps({"questions": items}, ensure_ascii=False)
+
+        lines = []
+        for number, item in enumerate(items, start=1):
+            lines.append(f"**Question {number}:** {item['question']}")
+            lines.append(f"**Ideal Answer:** {item['ideal_answer']}")
+            if item["code"]:
+                lines.append(f"```{item['code']['language']}")
+                lines.append(item["code"]["code"])
+                lines.append("```")
+            lines.append(f"**Evaluation:** {item['evaluation']}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def generate_content(self, prompt, model_name, generation_config=None, stream=False, timeout=None,
+                         system_instruction=None):
+        delay, error = self._draw()
+        text = self.render(prompt, generation_config, system_instruction)
+        usage = _usage(prompt, text, system_instruction)
+        if not stream:
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            return SimpleNamespace(text=text, usage_metadata=usage)
+
+        # Like the SDK, the request itself fails before any chunk is returned
+        first_chunk_delay = delay * 0.2
+        time.sleep(first_chunk_delay)
+        if error is not None:
+            raise error
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        return self._stream(chunks, usage, (delay - first_chunk_delay) / len(chunks))
+
+    @staticmethod
+    def _stream(chunks, usage, per_chunk_delay):
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(per_chunk_delay)
+            last = index == len(chunks) - 1
+            yield SimpleNamespace(text=chunk, usage_metadata=usage if last else None)
+
+
+class RecordingBackend(ModelBackend):
+    """
+    Wraps a real backend and appends every non-streamed response to a JSONL file
+    that FakeBackend(recordings_path=...) can replay.
+    """
+
+    def __init__(self, inner: ModelBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def configure(self) -> bool:
+        return self.inner.configure()
+
+    def generate_content(self, prompt, model_name, generation_config=None, stream=False, timeout=None,
+                         system_instruction=None):
+        response = self.inner.generate_content(prompt, model_name, generation_config=generation_config,
+                                               stream=stream, timeout=timeout, system_instruction=system_instruction)
+        if not stream:
+            entry = {"prompt_hash": recording_key(prompt, system_instruction), "model": model_name,
+                     "text": response.text}
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return response
@@ -0,0 +1,190 @@
+"""
+Fan-out generation of structured questions.
+
+A request for n questions is split into k smaller requests, each steered to a
+different focus area (responsibilities, technical skills, soft skills, code
+writing). They are sent concurrently, merged round-robin, near-duplicates are
+removed by normalized text similarity, and exactly n questions are returned.
+Output length, and therefore latency, per request is about n/k questions.
+"""
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+from instrumentation import annotate
+from question_models import (JSON_OUTPUT_INSTRUCTIONS, JSON_GENERATION_CONFIG, QuestionFormatError, parse_questions,
+                             replace_question)
+from response_cache import cached_generate
+
+MAX_WORKERS = int(os.getenv("QG_FANOUT_WORKERS", 8))
+DUPLICATE_THRESHOLD = 0.8  # SequenceMatcher ratio above which two questions count as the same
+OVERSAMPLE = 1  # extra questions asked per partial request, to absorb duplicates
+TOP_UP_ROUNDS = 2
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="qg-fanout")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def is_duplicate(a: str, b: str, threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    """
+    Compares two normalized question texts.
+    """
+    if a == b:
+        return True
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def deduplicate(questions, existing=(), threshold: float = DUPLICATE_THRESHOLD):
+    """
+    Returns `questions` without near-duplicates of each other or of `existing`, keeping the first occurrence.
+    """
+    seen = [normalize_text(q.text) for q in existing]
+    kept = []
+    for q in questions:
+        text = normalize_text(q.text)
+        if any(is_duplicate(text, other, threshold) for other in seen):
+            continue
+        seen.append(text)
+        kept.append(q)
+    return kept
+
+
+def split_counts(n: int, k: int) -> list:
+    """
+    Splits n into k nearly equal positive parts, e.g. split_counts(10, 4) == [3, 3, 2, 2].
+    """
+    base, extra = divmod(n, k)
+    return [base + (1 if i < extra else 0) for i in range(k)]
+
+
+def avoid_repeats(questions) -> str:
+    """
+    Prompt suffix listing questions the model must not repeat.
+    """
+    if not questions:
+        return ""
+    listed = "\n".join(f"- {q.text}" for q in questions)
+    return f"\n\nDo not repeat or rephrase any of these already selected questions:\n{listed}"
+
+
+def _interleave(batches) -> list:
+    merged = []
+    for i in range(max((len(b) for b in batches), default=0)):
+        merged.extend(b[i] for b in batches if i < len(b))
+    return merged
+
+
+def _generate(prompt: str, count: int, model_name, bypass_cache: bool, system_instruction: str = None) -> list:
+    text = cached_generate(prompt + JSON_OUTPUT_INSTRUCTIONS, model_name=model_name, bypass_cache=bypass_cache,
+                           generation_config=JSON_GENERATION_CONFIG,
+                           validate=lambda t: parse_questions(t, expected=count),
+                           system_instruction=system_instruction)
+    return parse_questions(text, expected=count)
+
+
+def generate_structured(make_prompt, n: int, focuses=None, avoid=(), model_name=None, bypass_cache=False,
+                        system_instruction: str = None) -> list:
+    """
+    Generates n structured questions, in one request or fanned out over focus areas.
+
+    Parameters:
+        - make_prompt: Callable (count, focus) returning the prompt for `count` questions;
+          focus is None for an unfocused request.
+        - n: Number of questions to return.
+        - focuses: Focus-area descriptions, one per concurrent request (at most n are used).
+          None or a single focus means a plain single request.
+        - avoid: Questions selected elsewhere (e.g. reused from the question bank) not to repeat.
+        - model_name, bypass_cache, system_instruction: Passed to the response cache.
+
+    Returns:
+        - A list of Question objects, numbered as returned by the model (renumber before display).
+
+    Raises:
+        - resilience.GenerationError or question_models.QuestionFormatError if any request fails.
+    """
+    if not focuses or len(focuses) < 2 or n < 2:
+        return _generate(make_prompt(n, None) + avoid_repeats(avoid), n, model_name, bypass_cache,
+                         system_instruction)
+
+    focuses = focuses[:n]
+    suffix = avoid_repeats(avoid)
+    futures = []
+    for count, focus in zip(split_counts(n, len(focuses)), focuses):
+        # Each worker runs in a copy of this context, so cache status and token
+        # usage are still recorded on the caller's instrumentation record
+        futures.append(_pool.submit(contextvars.copy_context().run, _generate,
+                                    make_prompt(count + OVERSAMPLE, focus) + suffix, count + OVERSAMPLE,
+                                    model_name, bypass_cache, system_instruction))
+    candidates = _interleave([f.result() for f in futures])
+    merged = deduplicate(candidates, existing=avoid)
+    annotate(fan_out=len(focuses), duplicates_removed=len(candidates) - len(merged))
+
+    for _ in range(TOP_UP_ROUNDS):
+        missing = n - len(merged)
+        if missing <= 0:
+            break
+        annotate(top_up=missing)
+        extra = _generate(make_prompt(missing, None) + avoid_repeats(list(avoid) + merged), missing,
+                          model_name, bypass_cache, system_instruction)
+        merged += deduplicate(extra, existing=list(avoid) + merged)
+
+    if len(merged) < n:
+        # Still short after topping up: fall back to the closest duplicates rather than fewer questions
+        merged += [q for q in candidates if q not in merged][:n - len(merged)]
+    return merged[:n]
+
+
+def regenerate_question(make_prompt, questions, question_id: str, model_name=None, bypass_cache=False,
+                        system_instruction: str = None, validate=None) -> list:
+    """
+    Replaces one question of a set with a freshly generated one, leaving the others untouched.
+
+    A single-question prompt lists the whole current set (the replaced question included)
+    as questions not to repeat, so the request costs about 1/n of a full regeneration.
+
+    Parameters:
+        - make_prompt: Callable (count, focus) returning the prompt for `count` questions, as for generate_structured.
+        - questions: The current set of Question objects.
+        - question_id: Id of the question to replace.
+        - model_name, bypass_cache, system_instruction: Passed to the response cache.
+        - validate: Optional callable run on the replacement (as a one-question list); it should raise on bad output.
+
+    Returns:
+        - A new list with the replacement at the same position and number; ids of the other questions are kept.
+
+    Raises:
+        - KeyError if no question has that id.
+        - resilience.GenerationError or question_models.QuestionFormatError if the request fails,
+          or QuestionFormatError if every attempt only repeated a question of the set.
+    """
+    if not any(q.id == question_id for q in questions):
+        raise KeyError(question_id)
+    for attempt in range(TOP_UP_ROUNDS + 1):
+        # Retries must reach the model: the cached answer is the duplicate being rejected
+        new = _generate(make_prompt(1, None) + avoid_repeats(questions), 1, model_name,
+                        bypass_cache or attempt > 0, system_instruction)[0]
+        if deduplicate([new], existing=questions):
+            break
+    else:
+        # A duplicate would give the set two questions with the same id
+        raise QuestionFormatError(f"No new question found in {TOP_UP_ROUNDS + 1} attempts: "
+                                  "every replacement repeated a question of the set")
+    if validate is not None:
+        validate([new])
+    annotate(regenerated=1)
+    return replace_question(questions, question_id, new)
+
+
+def stream_text(produce):
+    """
+    Generator that calls `produce` on first iteration and yields its text as one chunk,
+    for callers that asked for a stream.
+    """
+    yield produce()
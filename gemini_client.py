@@ -0,0 +1,258 @@
+"""
+Single, lazily-initialized access point to the model backend.
+
+The Gemini SDK is imported and configured on first use only, and GenerativeModel
+instances are cached per model name. All models share the SDK's default
+client, so the underlying transport and its connections are reused.
+Setting QG_BACKEND=fake (or calling set_backend) swaps in an offline backend.
+"""
+import abc
+import datetime
+import os
+import threading
+import time
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+import instrumentation
+import resilience
+
+DEFAULT_MODEL = os.getenv("QG_MODEL", "gemini-1.5-flash")
+REQUEST_TIMEOUT = float(os.getenv("QG_REQUEST_TIMEOUT", 60))  # seconds per request
+TRANSPORT = os.getenv("QG_TRANSPORT") or None  # "grpc" or "rest"; None keeps the SDK default
+
+BACKEND = os.getenv("QG_BACKEND", "gemini")  # "gemini" or "fake" (offline, see fake_backend.py)
+TOKEN_COUNTER = os.getenv("QG_TOKEN_COUNTER", "estimate")  # "estimate" (local) or "sdk" (count_tokens API call)
+CHARS_PER_TOKEN = 4
+
+# Explicit context caching of system instructions. The API refuses caches below a minimum
+# size (32768 tokens for gemini-1.5 models), so smaller instructions are sent as is.
+CONTEXT_CACHE = os.getenv("QG_CONTEXT_CACHE", "0") == "1"
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("QG_CONTEXT_CACHE_MIN_TOKENS", 32768))
+CONTEXT_CACHE_TTL = int(os.getenv("QG_CONTEXT_CACHE_TTL", 3600))  # seconds
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate (about 4 characters per token), free of any API call.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class ModelBackend(abc.ABC):
+    """
+    Interface between the generators and a model provider. Responses must expose
+    `.text` and optionally `.usage_metadata`; streaming responses are iterables of such chunks.
+    """
+
+    def configure(self) -> bool:
+        """
+        Prepares the backend. Returns False if it cannot be used (e.g. missing credentials).
+        """
+        return True
+
+    @abc.abstractmethod
+    def generate_content(self, prompt: str, model_name: str, generation_config: dict = None,
+                         stream: bool = False, timeout: float = None, system_instruction: str = None):
+        """
+        Sends one request to the model. Returns the response, or an iterable of chunks when `stream` is True.
+        """
+
+    def count_tokens(self, text: str, model_name: str) -> int:
+        return estimate_tokens(text)
+
+
+class GeminiBackend(ModelBackend):
+    """
+    The Google Gemini API through the google-generativeai SDK.
+    """
+
+    def __init__(self):
+        self._configured = False
+        self._lock = threading.Lock()
+        self._context_caches = {}  # (model, system instruction) -> (cached model or None, expiry)
+        self._context_lock = threading.Lock()
+
+    def configure(self) -> bool:
+        if self._configured:
+            return True
+        with self._lock:
+            if self._configured:
+                return True
+            key = api_key()
+            if not key:
+                return False
+            import google.generativeai as genai
+            genai.configure(api_key=key, transport=TRANSPORT)
+            self._configured = True
+        return True
+
+    @lru_cache(maxsize=None)
+    def get_model(self, model_name: str, system_instruction: str = None):
+        """
+        Returns the shared GenerativeModel for `model_name` and `system_instruction`, creating it on first use.
+        """
+        self.configure()
+        import google.generativeai as genai
+        return genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+
+    def cached_model(self, model_name: str, system_instruction: str):
+        """
+        Returns a GenerativeModel bound to a server-side context cache holding `system_instruction`,
+        so it is neither re-sent nor billed at the full input rate on each request. Returns None
+        (use get_model) when caching is disabled, the instruction is below CONTEXT_CACHE_MIN_TOKENS,
+        or the cache cannot be created. Caches are renewed shortly before they expire.
+        """
+        if not CONTEXT_CACHE:
+            return None
+        key = (model_name, system_instruction)
+        entry = self._context_caches.get(key)
+        if entry is not None and entry[1] > time.time() + 60:
+            return entry[0]
+        self.configure()
+        with self._context_lock:
+            entry = self._context_caches.get(key)
+            if entry is not None and entry[1] > time.time() + 60:
+                return entry[0]
+            model = None
+            if self.count_tokens(system_instruction, model_name) >= CONTEXT_CACHE_MIN_TOKENS:
+                try:
+                    import google.generativeai as genai
+                    from google.generativeai import caching
+                    content = caching.CachedContent.create(
+                        model=model_name,
+                        system_instruction=system_instruction,
+                        ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL),
+                    )
+                    model = genai.GenerativeModel.from_cached_content(cached_content=content)
+                except Exception:
+                    model = None  # caching is an optimization; fall back to plain system instructions
+            # Negative results are remembered too, so the size check and failures are not repeated per request
+            self._context_caches[key] = (model, time.time() + CONTEXT_CACHE_TTL)
+            return model
+
+    def generate_content(self, prompt, model_name, generation_config=None, stream=False, timeout=None,
+                         system_instruction=None):
+        model = self.cached_model(model_name, system_instruction) if system_instruction else None
+        if model is None:
+            model = self.get_model(model_name, system_instruction)
+        return model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=stream,
+            request_options={"timeout": timeout or REQUEST_TIMEOUT},
+        )
+
+    def count_tokens(self, text, model_name):
+        if TOKEN_COUNTER != "sdk":
+            return estimate_tokens(text)
+        try:
+            return self.get_model(model_name).count_tokens(text).total_tokens
+        except Exception:
+            return estimate_tokens(text)  # counting is informative only; never fail a generation on it
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def api_key():
+    load_dotenv()
+    return os.getenv("GEMINI_API_KEY")
+
+
+def get_backend() -> ModelBackend:
+    """
+    Returns the process-wide backend, chosen by QG_BACKEND on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if BACKEND == "fake":
+                    from fake_backend import FakeBackend
+                    _backend = FakeBackend.from_env()
+                else:
+                    _backend = GeminiBackend()
+    return _backend
+
+
+def set_backend(backend: ModelBackend) -> ModelBackend:
+    """
+    Replaces the process-wide backend (e.g. with a FakeBackend) and returns the previous one.
+    """
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+
+def configure() -> bool:
+    """
+    Configures the backend once per process.
+
+    Returns:
+        - True if the backend is usable (for Gemini: an API key is available), False otherwise.
+    """
+    return get_backend().configure()
+
+
+def generate(prompt: str, model_name: str = None, generation_config: dict = None,
+             stream: bool = False, timeout: float = None, deadline: float = None, system_instruction: str = None):
+    """
+    Calls generate_content on the current backend through the resilient call layer
+    (retries with backoff, deadline, hedging and quota circuit breaker).
+
+    Parameters:
+        - prompt: The full prompt text.
+        - model_name: Model to use (default: DEFAULT_MODEL).
+        - generation_config: Optional per-call generation config.
+        - stream: If True, returns the SDK's streaming response. Only the initial request is
+          retried, and streams are never hedged.
+        - timeout: Per-attempt timeout in seconds (default: REQUEST_TIMEOUT).
+        - deadline: Seconds allowed for the whole call (default: resilience.DEFAULT_DEADLINE).
+        - system_instruction: Static instructions (e.g. a prompt template's system part), sent as the
+          model's system instruction and context-cached when QG_CONTEXT_CACHE=1 and large enough.
+
+    Returns:
+        - The SDK response object (iterable of chunks when `stream` is True).
+
+    Raises:
+        - resilience.GenerationError subclasses.
+    """
+    backend = get_backend()
+    model_name = model_name or DEFAULT_MODEL
+
+    def attempt(remaining):
+        return backend.generate_content(
+            prompt,
+            model_name,
+            generation_config=generation_config,
+            stream=stream,
+            timeout=min(timeout or REQUEST_TIMEOUT, remaining),
+            system_instruction=system_instruction,
+        )
+
+    return resilience.call(attempt, deadline=deadline, hedge=not stream, latency_key=model_name)
+
+
+def count_tokens(text: str, model_name: str = None) -> int:
+    """
+    Counts the tokens of `text` for the model, with the SDK if QG_TOKEN_COUNTER=sdk
+    (one extra API round trip) or with the local estimate otherwise.
+    """
+    return get_backend().count_tokens(text, model_name or DEFAULT_MODEL)
+
+
+def generate_text(prompt: str, **kwargs) -> str:
+    """
+    Like generate, but returns the response text. A response without text
+    (e.g. a blocked prompt) raises resilience.FatalError.
+    """
+    response = generate(prompt, **kwargs)
+    instrumentation.note_usage(response)
+    try:
+        return response.text
+    except ValueError as e:
+        raise resilience.FatalError(f"The model returned no text: {e}") from e
@@ -0,0 +1,198 @@
+"""
+Shared syntax highlighting for generated code snippets.
+
+The language comes from the fence tag (```sql, ```java, ...) and is resolved to a
+Pygments lexer once per tag. Highlighted output is a tuple of styled runs
+(text, r, g, b, bold), memoized by a hash of the language and the code: first in a
+bounded in-process LRU, then in a SQLite store under the response cache directory,
+so re-exports, other export formats and other processes (bulk_export workers)
+reuse the same work. The on-screen st.code path uses the same tag resolution,
+so a snippet is shown and exported as the same language.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from pygments.lexers import TextLexer, get_lexer_by_name
+from pygments.styles import get_style_by_name
+from pygments.util import ClassNotFound
+
+from response_cache import CACHE_DIR, ResponseCache
+
+DEFAULT_LANGUAGE = "python"  # fences without a tag; the generators ask for Python examples by default
+CODE_STYLE = "default"
+MEMORY_ENTRIES = int(os.getenv("QG_HIGHLIGHT_MEMORY_ENTRIES", 512))
+DISK_ENTRIES = int(os.getenv("QG_HIGHLIGHT_DISK_ENTRIES", 5000))
+DISK_TTL = 30 * 24 * 3600  # seconds; highlighted output only changes with the Pygments version
+
+# Tags the model writes that Pygments does not know by that name
+_ALIASES = {
+    "py3": "python", "python3": "python", "golang": "go", "c#": "csharp", "cs": "csharp",
+    "f#": "fsharp", "shell": "bash", "console": "bash", "zsh": "bash", "plsql": "sql",
+    "postgres": "postgresql", "tsql": "sql", "yml": "yaml", "jsonc": "json", "vue": "html",
+    "text": "text", "plain": "text", "plaintext": "text", "txt": "text",
+}
+
+
+def _tag(tag: str) -> str:
+    """
+    Normalizes a fence tag: "```Python {linenos}" -> "python".
+    """
+    words = (tag or "").strip().strip("`").split()
+    return words[0].lower() if words else DEFAULT_LANGUAGE
+
+
+@lru_cache(maxsize=None)
+def get_lexer(tag: str):
+    """
+    Returns the shared Pygments lexer for a fence tag, or a plain-text lexer for unknown tags.
+    """
+    name = _tag(tag)
+    try:
+        return get_lexer_by_name(_ALIASES.get(name, name), stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return TextLexer(stripnl=False, ensurenl=False)
+
+
+@lru_cache(maxsize=None)
+def code_language(tag: str) -> str:
+    """
+    Canonical language name for a fence tag (the lexer's main alias), as passed to st.code
+    and used in highlight cache keys. Unknown tags map to "text".
+    """
+    aliases = get_lexer(tag).aliases
+    return aliases[0] if aliases else "text"
+
+
+@lru_cache(maxsize=1)
+def _code_style():
+    return get_style_by_name(CODE_STYLE)
+
+
+@lru_cache(maxsize=None)
+def token_style(ttype) -> tuple:
+    """
+    Maps a Pygments token type to (r, g, b, bold), resolved once per token type.
+    """
+    style = _code_style().style_for_token(ttype)
+    color = style["color"] or "000000"
+    return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16), style["bold"]
+
+
+def highlight_key(code: str, language: str) -> str:
+    payload = f"{CODE_STYLE}\0{language}\0{code}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _tokenize(code: str, language: str) -> tuple:
+    """
+    Lexes `code` into runs, merging adjacent tokens that share a style.
+    """
+    runs = []
+    for ttype, value in get_lexer(language).get_tokens(code):
+        style = token_style(ttype)
+        if runs and runs[-1][1:] == style:
+            runs[-1] = (runs[-1][0] + value,) + style
+        else:
+            runs.append((value,) + style)
+    return tuple(runs)
+
+
+class HighlightCache:
+    """
+    Two-level memo of highlighted snippets: a bounded in-memory LRU in front of a
+    ResponseCache file shared by every process using the same cache directory.
+
+    Parameters:
+        - path: SQLite file location (defaults to CACHE_DIR/highlight.sqlite3).
+        - memory_entries: Snippets kept in memory; least recently used are dropped first.
+        - disk_entries: Rows kept on disk.
+    """
+
+    def __init__(self, path: str = None, memory_entries: int = MEMORY_ENTRIES, disk_entries: int = DISK_ENTRIES):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "highlight.sqlite3")
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.memory_hits = 0
+        self.lexed = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_pid = None
+
+    def _store(self) -> ResponseCache:
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._disk is None or self._disk_pid != os.getpid():
+            self._disk = ResponseCache(self.path, ttl=DISK_TTL, max_entries=self.disk_entries)
+            self._disk_pid = os.getpid()
+        return self._disk
+
+    def highlight(self, code: str, language: str) -> tuple:
+        key = highlight_key(code, language)
+        with self._lock:
+            runs = self._memory.get(key)
+            if runs is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return runs
+        stored = self._store().get(key)
+        if stored is not None:
+            runs = tuple(tuple(run) for run in json.loads(stored))
+        else:
+            runs = _tokenize(code, language)
+            self._store().set(key, json.dumps(runs, ensure_ascii=False))
+            self.lexed += 1
+        with self._lock:
+            self._memory[key] = runs
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return runs
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = 0
+            self.lexed = 0
+        self._store().clear()
+
+    def stats(self) -> dict:
+        disk = self._store().stats()
+        with self._lock:
+            return {"memory_entries": len(self._memory), "memory_hits": self.memory_hits,
+                    "disk_entries": disk["entries"], "disk_hits": disk["hits"], "lexed": self.lexed}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_highlight_cache() -> HighlightCache:
+    """
+    Returns the process-wide highlight cache, creating it on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = HighlightCache()
+    return _default_cache
+
+
+def highlight(code: str, tag: str = None) -> tuple:
+    """
+    Highlights a code snippet, reusing earlier results for the same code and language.
+
+    Parameters:
+        - code: The snippet, without its fences.
+        - tag: The fence tag (e.g. "sql", "Java"); empty means DEFAULT_LANGUAGE.
+
+    Returns:
+        - A tuple of (text, r, g, b, bold) runs covering the whole snippet.
+    """
+    return get_highlight_cache().highlight(code.expandtabs(4), code_language(tag))
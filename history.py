@@ -0,0 +1,296 @@
+"""
+Persistent, searchable history of generated question sets.
+
+Every set generated in the app is stored in CACHE_DIR/history.sqlite3: the whole
+text once per set, and each question on its own row, with zlib-compressed bodies.
+Questions are indexed twice:
+- an FTS5 full-text index over question, answer and code. It is contentless, so
+  the text is not stored a second time: a search returns row ids and only the
+  bodies of the page being shown are decompressed;
+- secondary indexes on role, level, question type and language, each ending
+  with the row id.
+Results come newest first and are paginated with a cursor (the last id seen), so
+every page is a bounded index range scan, whatever the size of the history.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+from exporters import content_hash
+from question_models import question_id
+from question_parser import CODE, QUESTION, TEXT, split_questions
+from response_cache import CACHE_DIR
+
+ENABLED = os.getenv("QG_HISTORY", "1") == "1"
+PAGE_SIZE = 20
+COMPRESSION_LEVEL = 6
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# "**Question 3:** ", "1. **Interview Question:** ", "Pregunta 2: "... in front of a text-mode question
+_QUESTION_LABEL = re.compile(
+    r"^[#*_\s]*(?:\d+[.)]\s*)?[*_\s]*(?:interview\s+)?(?:question|pregunta)[^:]{0,30}:[*_\s]*", re.IGNORECASE
+)
+# "**Question 1**" alone on its line, above the question itself
+_BARE_LABEL = re.compile(
+    r"^[#*_\s]*(?:\d+[.)]\s*)?[*_\s]*(?:interview\s+)?(?:question|pregunta)\s*\d*[*_:.\s]*$", re.IGNORECASE
+)
+
+
+class HistoryHit(NamedTuple):
+    id: int
+    generation_id: int
+    created_at: float
+    role: str
+    level: str
+    question_type: str
+    language: str
+    question: str
+    answer: str
+    code: list  # (language, code) pairs
+
+
+def _pack(data) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _structured_entries(questions) -> list:
+    return [{"question": q.text, "answer": f"{q.ideal_answer.text}\n\n{q.evaluation.text}",
+             "code": [[q.code.language, q.code.code]] if q.code else []} for q in questions]
+
+
+def _text_entries(events) -> list:
+    """
+    Splits parsed text-mode output into questions: the first line after each boundary is
+    the question (a heading such as "### Question 1" is skipped), the other lines the answer.
+    """
+    entries = []
+    for segment in split_questions(events):
+        if segment[0].kind != QUESTION:
+            continue  # an introduction before the first question
+        prose = [e.text for e in segment if e.kind == TEXT]
+        while len(prose) > 1 and _BARE_LABEL.match(prose[0]):
+            prose.pop(0)
+        if not prose:
+            continue
+        question = _QUESTION_LABEL.sub("", prose[0]).strip() or prose[0]
+        entries.append({"question": question, "answer": "\n\n".join(prose[1:]),
+                        "code": [[e.language, e.text] for e in segment if e.kind == CODE]})
+    return entries
+
+
+def fts_query(text: str) -> str:
+    """
+    Turns free text into an FTS5 query: every word must match, the last one as a prefix
+    (so results show up while a word is being typed). Returns "" for text without words.
+    """
+    words = _WORD.findall(text)
+    if not words:
+        return ""
+    return " ".join(f'"{w}"' for w in words) + "*"
+
+
+class HistoryStore:
+    """
+    SQLite store of generated sets and their questions.
+
+    Parameters:
+        - path: SQLite file location (defaults to CACHE_DIR/history.sqlite3).
+    """
+
+    def __init__(self, path: str = None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "history.sqlite3")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " id INTEGER PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " generator TEXT, role TEXT, level TEXT, question_type TEXT, language TEXT, n INTEGER,"
+            " content_hash TEXT NOT NULL UNIQUE,"
+            " body BLOB NOT NULL);"  # zlib-compressed text of the whole set
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id INTEGER PRIMARY KEY,"
+            " generation_id INTEGER NOT NULL REFERENCES generations(id),"
+            " created_at REAL NOT NULL,"
+            " role TEXT COLLATE NOCASE, level TEXT, question_type TEXT COLLATE NOCASE, language TEXT,"
+            " question_id TEXT NOT NULL,"
+            " body BLOB NOT NULL);"  # zlib-compressed {"question", "answer", "code"}
+            "CREATE UNIQUE INDEX IF NOT EXISTS questions_unique ON questions(question_id, language);"
+            "CREATE INDEX IF NOT EXISTS questions_role ON questions(role, id);"
+            "CREATE INDEX IF NOT EXISTS questions_level ON questions(level, id);"
+            "CREATE INDEX IF NOT EXISTS questions_type ON questions(question_type, id);"
+            "CREATE INDEX IF NOT EXISTS questions_language ON questions(language, id);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+            " question, answer, code, content='', tokenize='unicode61 remove_diacritics 2');"
+        )
+
+    def record(self, text: str, events, questions=None, generator: str = None, role: str = None,
+               level: str = None, question_type: str = None, language: str = None, n: int = None) -> int:
+        """
+        Stores a generated set. Questions already in the history (same text and language) are
+        not indexed again, and a set identical to a stored one is not stored twice.
+
+        Parameters:
+            - text: The generated text, as shown and exported.
+            - events: `text` parsed by question_parser.parse.
+            - questions: The Question objects of a structured result, None for text output.
+            - generator, role, level, question_type, language, n: The request, for filtering.
+
+        Returns:
+            - The id of the new set, or None if it was already stored.
+        """
+        entries = _structured_entries(questions) if questions else _text_entries(events)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO generations"
+                    " (created_at, generator, role, level, question_type, language, n, content_hash, body)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, generator, role, level, question_type, language, n, content_hash(text),
+                     zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)),
+                )
+                if not cursor.rowcount:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                generation_id = cursor.lastrowid
+                for entry in entries:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO questions"
+                        " (generation_id, created_at, role, level, question_type, language, question_id, body)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (generation_id, now, role, level, question_type, language, question_id(entry["question"]),
+                         _pack(entry)),
+                    )
+                    if cursor.rowcount:
+                        self._conn.execute(
+                            "INSERT INTO questions_fts (rowid, question, answer, code) VALUES (?, ?, ?, ?)",
+                            (cursor.lastrowid, entry["question"], entry["answer"],
+                             "\n".join(code for _, code in entry["code"])),
+                        )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return generation_id
+
+    def search(self, query: str = "", role: str = None, level: str = None, question_type: str = None,
+               language: str = None, before: int = None, limit: int = PAGE_SIZE) -> list:
+        """
+        Returns one page of stored questions, newest first.
+
+        Parameters:
+            - query: Free text; every word must appear in the question, answer or code (see fts_query).
+            - role, level, question_type, language: Exact filters when given (role and type ignore case).
+            - before: Cursor: only questions older than this question id (the last id of the previous page).
+            - limit: Page size.
+
+        Returns:
+            - A list of HistoryHit.
+        """
+        where, params = [], []
+        for column, value in (("role", role), ("level", level), ("question_type", question_type),
+                              ("language", language)):
+            if value:
+                where.append(f"q.{column} = ?")
+                params.append(value.strip())
+        if before is not None:
+            where.append("q.id < ?")
+            params.append(before)
+        match = fts_query(query or "")
+        if match:
+            sql = ("SELECT q.id, q.generation_id, q.created_at, q.role, q.level, q.question_type, q.language, q.body"
+                   " FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid"
+                   " WHERE questions_fts MATCH ?" + "".join(f" AND {w}" for w in where) +
+                   " ORDER BY questions_fts.rowid DESC LIMIT ?")
+            params = [match] + params
+        else:
+            sql = ("SELECT q.id, q.generation_id, q.created_at, q.role, q.level, q.question_type, q.language, q.body"
+                   " FROM questions q" + (" WHERE " + " AND ".join(where) if where else "") +
+                   " ORDER BY q.id DESC LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        hits = []
+        for row in rows:
+            entry = _unpack(row[7])
+            hits.append(HistoryHit(*row[:7], question=entry["question"], answer=entry["answer"],
+                                   code=[tuple(c) for c in entry["code"]]))
+        return hits
+
+    def generation(self, generation_id: int) -> str:
+        """
+        Returns the whole text of a stored set, or None if there is no such set.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM generations WHERE id = ?", (generation_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript(
+                "BEGIN; INSERT INTO questions_fts(questions_fts) VALUES ('delete-all');"
+                " DELETE FROM questions; DELETE FROM generations; COMMIT;"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            (sets,) = self._conn.execute("SELECT COUNT(*) FROM generations").fetchone()
+            (questions,) = self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {"sets": sets, "questions": questions, "size_mb": round(size / 1e6, 1)}
+
+
+def record_request(generator, kwargs: dict, text: str, events, questions=None) -> int:
+    """
+    Records a finished generation in the history store, if ENABLED.
+
+    Parameters:
+        - generator: The generator function that produced it.
+        - kwargs: Its arguments, as main_app sends them (skills or job-description names).
+        - text, events, questions: The result, as for HistoryStore.record.
+
+    Returns:
+        - The id of the new set, or None if it was already stored or history is disabled.
+    """
+    if not ENABLED:
+        return None
+    return get_history().record(
+        text, events, questions,
+        generator=getattr(generator, "__name__", None),
+        role=kwargs.get("rol") or kwargs.get("role"),
+        level=kwargs.get("level"),
+        question_type=kwargs.get("type") or kwargs.get("question_type"),
+        language=kwargs.get("language"),
+        n=len(questions) if questions else kwargs.get("n"),
+    )
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_history() -> HistoryStore:
+    """
+    Returns the process-wide history store, creating it on first use.
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = HistoryStore()
+    return _default_store
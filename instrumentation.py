@@ -0,0 +1,294 @@
+"""
+Lightweight latency and token-usage instrumentation.
+
+Each instrumented call appends one record to an in-process ring buffer:
+operation, labels, wall time, prompt/output tokens (from the response's
+usage_metadata), cache status and error class. Records can be summarized
+into percentiles or exported as JSONL or Prometheus text format. Counts, time
+and token totals are also kept for the whole process, so exported counters never
+go down when old records leave the buffer.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+BUFFER_SIZE = int(os.getenv("QG_METRICS_BUFFER", 5000))
+JSONL_PATH = os.getenv("QG_METRICS_JSONL")  # if set, every record is also appended to this file
+
+_records = deque(maxlen=BUFFER_SIZE)
+_totals = {}  # (operation, question_type) -> process-lifetime counts, seconds, tokens and errors
+_lock = threading.Lock()
+_current = contextvars.ContextVar("qg_current_record", default=None)
+
+
+def _new_totals() -> dict:
+    return {"count": 0, "seconds": 0.0, "prompt": 0, "output": 0, "saved": 0, "errors": {}}
+
+
+def _add_to_totals(record: dict):
+    totals = _totals.get((record["operation"], record.get("question_type")))
+    if totals is None:
+        totals = _totals[(record["operation"], record.get("question_type"))] = _new_totals()
+    totals["count"] += 1
+    totals["seconds"] += record["seconds"]
+    for kind, field in (("prompt", "prompt_tokens"), ("output", "output_tokens"), ("saved", "tokens_saved")):
+        totals[kind] += record.get(field) or 0
+    if record.get("error"):
+        totals["errors"][record["error"]] = totals["errors"].get(record["error"], 0) + 1
+
+
+def _store(record: dict):
+    with _lock:
+        _records.append(record)
+        _add_to_totals(record)
+        if JSONL_PATH:
+            with open(JSONL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def annotate(**fields):
+    """
+    Adds fields (e.g. cache="hit") to the record of the innermost running timed() block, if any.
+    """
+    record = _current.get()
+    if record is not None:
+        record.update(fields)
+
+
+def note_usage(response):
+    """
+    Accumulates token counts from a response's usage_metadata into the current record.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    record = _current.get()
+    if usage is None or record is None:
+        return
+    for field, attr in (("prompt_tokens", "prompt_token_count"), ("output_tokens", "candidates_token_count"),
+                        ("cached_tokens", "cached_content_token_count")):
+        value = getattr(usage, attr, None)
+        if value:
+            record[field] = (record.get(field) or 0) + value
+
+
+def current_usage() -> tuple:
+    """
+    (prompt_tokens, output_tokens) accumulated so far on the record of the innermost timed() block,
+    (0, 0) outside of one. Lets a step inside an instrumented call measure its own share.
+    """
+    record = _current.get()
+    if record is None:
+        return 0, 0
+    return record.get("prompt_tokens") or 0, record.get("output_tokens") or 0
+
+
+def store_record(operation: str, seconds: float, **fields):
+    """
+    Stores a record for a step timed by the caller (e.g. one attempt within an instrumented call),
+    without making it the current record.
+    """
+    _store({"operation": operation, "timestamp": time.time() - seconds, "cache": None, "prompt_tokens": None,
+            "output_tokens": None, "error": None, **fields, "seconds": seconds})
+
+
+@contextmanager
+def timed(operation: str, **labels):
+    """
+    Times the enclosed block and stores a record for it. Yields the record so the
+    block can add fields of its own.
+    """
+    record = {"operation": operation, "timestamp": time.time(), **labels,
+              "cache": None, "prompt_tokens": None, "output_tokens": None, "error": None}
+    token = _current.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except GeneratorExit:
+        record["abandoned"] = True  # the consumer stopped reading a stream
+        raise
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        try:
+            _current.reset(token)
+        except ValueError:  # a stream finished in a different context than it started
+            _current.set(None)
+        _store(record)
+
+
+def _timed_iter(operation, labels, produce):
+    # Streams are timed from the first request to the last chunk. The wrapped function
+    # only runs on the first next(), inside the record, so its annotations land on it.
+    with timed(operation, **labels) as record:
+        start = time.perf_counter()
+        chunks = 0
+        for chunk in produce():
+            if not chunks:
+                record["first_chunk_seconds"] = time.perf_counter() - start
+            chunks += 1
+            yield chunk
+        record["chunks"] = chunks
+
+
+def instrumented(operation: str, **label_args):
+    """
+    Decorator that times every call of the wrapped function.
+
+    Parameters:
+        - operation: Name recorded for the call.
+        - label_args: Maps a label name to the wrapped function's parameter providing its value,
+          e.g. question_type="type".
+
+    If the call is made with stream=True, the returned iterator is timed until exhausted.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            labels = {label: bound.arguments.get(param) for label, param in label_args.items()}
+            if bound.arguments.get("stream"):
+                return _timed_iter(operation, labels, lambda: fn(*args, **kwargs))
+            with timed(operation, **labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def records(operation: str = None) -> list:
+    with _lock:
+        snapshot = list(_records)
+    if operation is not None:
+        snapshot = [r for r in snapshot if r["operation"] == operation]
+    return snapshot
+
+
+def clear():
+    """
+    Empties the buffer and resets the process totals (seen as a counter reset by Prometheus).
+    """
+    with _lock:
+        _records.clear()
+        _totals.clear()
+
+
+def percentile(values, p: float):
+    """
+    Nearest-rank percentile of `values` (p between 0 and 100).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summary(group_by: str = "question_type") -> list:
+    """
+    Aggregates the buffer per operation and `group_by` label: call count, error count,
+    cache hits, p50/p95/p99 latency, p50 time to first chunk for streams and average tokens
+    (per call, per question, served from a context cache and saved by compaction), and the
+    average estimated cost where the model router recorded one.
+    """
+    groups = {}
+    for r in records():
+        groups.setdefault((r["operation"], r.get(group_by)), []).append(r)
+
+    rows = []
+    for (operation, group), items in sorted(groups.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))):
+        seconds = [r["seconds"] for r in items]
+        prompt_tokens = [r["prompt_tokens"] for r in items if r.get("prompt_tokens")]
+        output_tokens = [r["output_tokens"] for r in items if r.get("output_tokens")]
+        per_question = [r["output_tokens"] / r["n"] for r in items if r.get("output_tokens") and r.get("n")]
+        saved = [r["tokens_saved"] for r in items if r.get("tokens_saved") is not None]
+        cached = [r.get("cached_tokens") or 0 for r in items if r.get("prompt_tokens")]
+        costs = [r["cost_usd"] for r in items if r.get("cost_usd") is not None]
+        first_chunk = [r["first_chunk_seconds"] for r in items if r.get("first_chunk_seconds") is not None]
+        rows.append({
+            "operation": operation,
+            group_by: group,
+            "calls": len(items),
+            "errors": sum(1 for r in items if r.get("error")),
+            "cache_hits": sum(1 for r in items if r.get("cache") == "hit"),
+            "p50_s": percentile(seconds, 50),
+            "p95_s": percentile(seconds, 95),
+            "p99_s": percentile(seconds, 99),
+            "first_chunk_p50_s": percentile(first_chunk, 50) if first_chunk else None,
+            "avg_prompt_tokens": sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else None,
+            "avg_output_tokens": sum(output_tokens) / len(output_tokens) if output_tokens else None,
+            "avg_cached_tokens": sum(cached) / len(cached) if cached else None,
+            "output_tokens_per_question": sum(per_question) / len(per_question) if per_question else None,
+            "avg_tokens_saved": sum(saved) / len(saved) if saved else None,
+            "avg_cost_usd": sum(costs) / len(costs) if costs else None,
+        })
+    return rows
+
+
+def export_jsonl() -> str:
+    return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records())
+
+
+def _label_text(labels: dict) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def export_prometheus() -> str:
+    """
+    Renders metrics in Prometheus text exposition format. Quantiles are computed over the
+    buffered window; _sum, _count, token and error counters are process totals, so they
+    only ever increase.
+    """
+    lines = [
+        "# HELP qg_operation_seconds Wall time of instrumented operations.",
+        "# TYPE qg_operation_seconds summary",
+    ]
+    token_lines = [
+        "# HELP qg_tokens_total Tokens used by instrumented operations.",
+        "# TYPE qg_tokens_total counter",
+    ]
+    error_lines = [
+        "# HELP qg_errors_total Failed operations by error class.",
+        "# TYPE qg_errors_total counter",
+    ]
+    window = {}
+    for r in records():
+        window.setdefault((r["operation"], r.get("question_type")), []).append(r["seconds"])
+    with _lock:
+        totals = {key: {**value, "errors": dict(value["errors"])} for key, value in _totals.items()}
+
+    errors = {}
+    for (operation, question_type), total in sorted(totals.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))):
+        labels = {"operation": operation}
+        if question_type is not None:
+            labels["question_type"] = question_type
+        seconds = window.get((operation, question_type))
+        if seconds:
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f"qg_operation_seconds{_label_text({**labels, 'quantile': q})} "
+                             f"{percentile(seconds, q * 100):.6f}")
+        lines.append(f"qg_operation_seconds_sum{_label_text(labels)} {total['seconds']:.6f}")
+        lines.append(f"qg_operation_seconds_count{_label_text(labels)} {total['count']}")
+        for kind in ("prompt", "output", "saved"):
+            if total[kind]:
+                token_lines.append(f"qg_tokens_total{_label_text({**labels, 'kind': kind})} {total[kind]}")
+        for error, count in total["errors"].items():
+            errors[(operation, error)] = errors.get((operation, error), 0) + count
+
+    for (operation, error), count in sorted(errors.items()):
+        error_lines.append(f"qg_errors_total{_label_text({'operation': operation, 'error': error})} {count}")
+    return "\n".join(lines + token_lines + error_lines) + "\n"
@@ -0,0 +1,188 @@
+"""
+Process-wide background job queue for generations.
+
+Jobs run on a fixed number of worker threads shared by every Streamlit session,
+so a rerun of the script never blocks on (or throws away) a model call. Queued
+jobs are scheduled round-robin across owners (sessions): a user who submits
+many jobs cannot starve the others. Streamed results are collected chunk by
+chunk, so pages can poll a job and show its progress.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+MAX_WORKERS = int(os.getenv("QG_JOB_WORKERS", 4))
+MAX_PENDING_PER_OWNER = int(os.getenv("QG_JOB_MAX_PENDING", 3))  # queued or running jobs per session
+RESULT_TTL = 3600  # seconds a finished job is kept for polling
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class QueueFullError(Exception):
+    """
+    The owner already has MAX_PENDING_PER_OWNER unfinished jobs.
+    """
+
+
+@dataclass(eq=False)
+class Job:
+    id: str
+    owner: str
+    fn: object
+    kwargs: dict
+    status: str = QUEUED
+    result: object = None
+    error: Exception = None
+    chunks: list = field(default_factory=list)  # text received so far, for streamed results
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+    cancel_requested: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def progress_text(self) -> str:
+        return "".join(self.chunks)
+
+
+class JobQueue:
+    """
+    Parameters:
+        - max_workers: Worker threads, i.e. generations running at the same time across all sessions.
+        - max_pending_per_owner: Unfinished jobs allowed per owner before submit() refuses new ones.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending_per_owner: int = MAX_PENDING_PER_OWNER):
+        self.max_workers = max_workers
+        self.max_pending_per_owner = max_pending_per_owner
+        self._jobs = {}
+        self._queues = OrderedDict()  # owner -> deque of queued jobs, in round-robin order
+        self._condition = threading.Condition()
+        self._workers = []
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"qg-job-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _purge(self):
+        cutoff = time.time() - RESULT_TTL
+        for job_id in [j.id for j in self._jobs.values()
+                       if j.finished and j.finished_at is not None and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, owner: str, fn, **kwargs) -> str:
+        """
+        Queues `fn(**kwargs)` on behalf of `owner` and returns the job id.
+        If fn returns an iterator of text chunks, they are collected as the job's progress.
+
+        Raises:
+            - QueueFullError if the owner already has too many unfinished jobs.
+        """
+        with self._condition:
+            self._purge()
+            pending = sum(1 for j in self._jobs.values() if j.owner == owner and not j.finished)
+            if pending >= self.max_pending_per_owner:
+                raise QueueFullError(f"Already {pending} generations in progress; wait for one to finish.")
+            job = Job(id=uuid.uuid4().hex, owner=owner, fn=fn, kwargs=kwargs)
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._start_workers()
+            self._condition.notify()
+        return job.id
+
+    def _next_job(self) -> Job:
+        # Round-robin: take the first owner's oldest job, then move that owner to the back
+        while not self._queues:
+            self._condition.wait()
+        owner, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        del self._queues[owner]
+        if jobs:
+            self._queues[owner] = jobs
+        return job
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                job.status = RUNNING
+                job.started_at = time.time()
+            try:
+                result = job.fn(**job.kwargs)
+                if hasattr(result, "__next__"):
+                    for chunk in result:
+                        job.chunks.append(chunk)
+                        if job.cancel_requested:
+                            result.close()
+                            break
+                    result = job.progress_text()
+                job.result = result
+                self._finish(job, CANCELLED if job.cancel_requested else DONE)
+            except Exception as e:
+                job.error = e
+                self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str):
+        # Status and finish time change together, so _purge never sees a finished job without a time
+        with self._condition:
+            job.finished_at = time.time()
+            job.status = status
+
+    def get(self, job_id: str) -> Job:
+        """
+        Returns the job, or None if it is unknown or expired.
+        """
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """
+        Drops a queued job, or stops a running streamed job after its current chunk.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                jobs = self._queues.get(job.owner)
+                if jobs is not None and job in jobs:
+                    jobs.remove(job)
+                    if not jobs:
+                        del self._queues[job.owner]
+                job.status = CANCELLED
+                job.finished_at = time.time()
+
+    def stats(self) -> dict:
+        with self._condition:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.max_workers,
+            "queued": sum(1 for j in jobs if j.status == QUEUED),
+            "running": sum(1 for j in jobs if j.status == RUNNING),
+            "finished": sum(1 for j in jobs if j.finished),
+            "owners": len({j.owner for j in jobs if not j.finished}),
+        }
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """
+    Returns the process-wide job queue, creating it on first use.
+    """
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = JobQueue()
+    return _default_queue
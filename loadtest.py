@@ -0,0 +1,347 @@
+"""
+Load test simulating many concurrent Streamlit sessions against the offline fake backend.
+
+Each simulated session does what a recruiter's browser session does in main_app.py:
+submit a generation to the shared job queue, poll it while feeding the streamed text
+to the incremental parser, record it in the history store, then prepare the exports
+through the artifact store. Sessions run as threads, like Streamlit script runs. Example:
+
+    python loadtest.py --sessions 200 --iterations 3 --latency 2 --formats pdf,txt
+    python loadtest.py --sessions 50 --json run.json --max-rss-growth 50 --fail-on-leak
+
+The report has throughput, latency percentiles per phase (queue wait, generation,
+end to end, history write, each export format), process CPU time, RSS growth from the warmed-up
+baseline, and the temp files and open file handles left behind. Size the job queue
+with QG_JOB_WORKERS, as in production.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# Keep load test runs away from the real caches
+_OWN_CACHE_DIR = None
+if "QG_CACHE_DIR" not in os.environ:
+    _OWN_CACHE_DIR = os.environ["QG_CACHE_DIR"] = tempfile.mkdtemp(prefix="qg-loadtest-")
+
+import gemini_client
+import history
+from exporters import EXPORT_FORMATS, stored_export
+from fake_backend import FakeBackend
+from instrumentation import percentile
+from job_queue import DONE, get_queue
+from question_gen import question_generator_gemini
+from question_models import questions_to_lines
+from question_parser import IncrementalParser, parse
+
+POLL_INTERVAL = 0.3  # seconds, as main_app.JOB_POLL_INTERVAL
+PHASES = ("queue_wait", "generate", "end_to_end")
+
+ROLES = ("Data Analyst", "Backend Developer", "Data Engineer", "QA Engineer", "DevOps Engineer",
+         "Frontend Developer", "Product Manager", "Machine Learning Engineer")
+SKILLS = ("SQL, Python", "Java, Spring, SQL", "Python, Airflow, Spark", "Selenium, Python",
+          "Docker, Kubernetes, Bash", "JavaScript, React", "Roadmaps, Analytics", "Python, PyTorch")
+
+
+def _rss_bytes():
+    """
+    Current resident set size of this process, or None where it cannot be read.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _open_files():
+    """
+    Number of open file descriptors (handles on Windows), or None where it cannot be read.
+    """
+    try:
+        import psutil
+        process = psutil.Process()
+        return process.num_handles() if os.name == "nt" else process.num_fds()
+    except ImportError:
+        pass
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def _temp_entries() -> set:
+    return set(os.listdir(tempfile.gettempdir()))
+
+
+class LoadTest:
+    """
+    Parameters:
+        - sessions: Concurrent simulated sessions.
+        - iterations: Generations (each followed by its exports) per session.
+        - formats: Export formats prepared after each generation (keys of exporters.EXPORT_FORMATS).
+        - n: Questions per generation.
+        - structured_ratio: Share of generations in JSON mode; the rest stream text.
+        - repeat_ratio: Share of generations repeating an earlier request (response cache hits).
+        - think_time: Maximum seconds a session idles before each generation (uniformly drawn).
+        - ramp_up: Seconds over which session starts are spread.
+        - seed: Seed of the random choices, for repeatable runs.
+    """
+
+    def __init__(self, sessions: int = 20, iterations: int = 3, formats=("pdf",), n: int = 5,
+                 structured_ratio: float = 0.5, repeat_ratio: float = 0.2, think_time: float = 0.0,
+                 ramp_up: float = 0.0, seed: int = 0):
+        self.sessions = sessions
+        self.iterations = iterations
+        self.formats = list(formats)
+        self.n = n
+        self.structured_ratio = structured_ratio
+        self.repeat_ratio = repeat_ratio
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.seed = seed
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def _spec(self, rng: random.Random, session: int, iteration: int) -> dict:
+        index = rng.randrange(len(ROLES))
+        role = ROLES[index]
+        if rng.random() >= self.repeat_ratio:
+            role = f"{role} #{session}-{iteration}"  # a request nobody made before: cache miss
+        return {"rol": role, "level": rng.choice(("Junior", "Mid", "Senior")), "level_description": "",
+                "type": "Technique", "responsibilities": "", "technical_skills": SKILLS[index],
+                "soft_skills": "Communication", "language": "English", "n": self.n}
+
+    def _record(self, phase: str, seconds: float):
+        with self._lock:
+            self.timings[phase].append(seconds)
+
+    def _fail(self, phase: str, error: BaseException):
+        with self._lock:
+            self.errors[f"{phase}: {type(error).__name__}"] += 1
+
+    def run_generation(self, owner: str, spec: dict, structured: bool):
+        """
+        One generation and its exports, timed phase by phase. Returns False if it failed.
+        """
+        queue = get_queue()
+        kwargs = dict(spec, output_format="json") if structured else dict(spec, stream=True)
+        start = time.perf_counter()
+        try:
+            job_id = queue.submit(owner, question_generator_gemini, **kwargs)
+        except Exception as e:
+            self._fail("submit", e)
+            return False
+
+        parser = IncrementalParser()
+        fed = 0
+        job = queue.get(job_id)
+        while not job.finished:
+            chunks = job.chunks[fed:]
+            parser.feed("".join(chunks))
+            fed += len(chunks)
+            time.sleep(POLL_INTERVAL)
+        parser.feed("".join(job.chunks[fed:]))
+        end_to_end = time.perf_counter() - start
+        if job.status != DONE:
+            self._fail("generate", job.error or RuntimeError(job.status))
+            return False
+        self._record("queue_wait", job.started_at - job.submitted_at)
+        self._record("generate", job.finished_at - job.started_at)
+        self._record("end_to_end", end_to_end)
+
+        if isinstance(job.result, list):
+            text = "\n".join(questions_to_lines(job.result))
+            events = parse(text)
+        else:
+            text = job.result
+            parser.close()
+            events = parser.events
+        # The same SQLite writes as main_app: history (remember) and artifact store (build_export)
+        start = time.perf_counter()
+        try:
+            history.record_request(question_generator_gemini, spec, text, events,
+                                   job.result if isinstance(job.result, list) else None)
+        except Exception as e:
+            self._fail("history", e)
+            return False
+        self._record("history", time.perf_counter() - start)
+        for fmt in self.formats:
+            start = time.perf_counter()
+            try:
+                stored_export(text, fmt, events)
+            except Exception as e:
+                self._fail(f"export_{fmt}", e)
+                return False
+            self._record(f"export_{fmt}", time.perf_counter() - start)
+        with self._lock:
+            self.completed += 1
+        return True
+
+    def _session(self, session: int):
+        rng = random.Random(self.seed * 100003 + session)
+        if self.ramp_up:
+            time.sleep(self.ramp_up * session / max(1, self.sessions))
+        owner = f"loadtest-{session}"
+        for iteration in range(self.iterations):
+            if self.think_time:
+                time.sleep(rng.uniform(0, self.think_time))
+            self.run_generation(owner, self._spec(rng, session, iteration), rng.random() < self.structured_ratio)
+
+    def warm_up(self):
+        """
+        Loads fonts, lexers and caches once, so they do not count as RSS growth.
+        """
+        rng = random.Random(self.seed)
+        for structured in (False, True):
+            self.run_generation("loadtest-warmup", self._spec(rng, -1, int(structured)), structured)
+        self.timings.clear()
+        self.errors.clear()
+        self.completed = 0
+
+    def run(self) -> dict:
+        """
+        Runs all sessions to completion and returns the report.
+        """
+        self.warm_up()
+        temp_before = _temp_entries()
+        files_before = _open_files()
+        rss_before = _rss_bytes()
+        rss_peak = rss_before
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+
+        threads = [threading.Thread(target=self._session, args=(i,), name=f"loadtest-{i}", daemon=True)
+                   for i in range(self.sessions)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.2)
+            rss = _rss_bytes()
+            if rss is not None:
+                rss_peak = max(rss_peak, rss)
+
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        rss_after = _rss_bytes()
+        files_after = _open_files()
+        leaked = sorted(_temp_entries() - temp_before)
+        generations = self.sessions * self.iterations
+        return {
+            "sessions": self.sessions,
+            "generations": generations,
+            "completed": self.completed,
+            "errors": dict(self.errors),
+            "seconds": wall,
+            "throughput_per_s": self.completed / wall if wall else None,
+            "cpu_seconds": cpu,
+            "cpu_utilization": cpu / wall if wall else None,
+            "rss_before_mb": rss_before / 2 ** 20 if rss_before is not None else None,
+            "rss_after_mb": rss_after / 2 ** 20 if rss_after is not None else None,
+            "rss_peak_mb": rss_peak / 2 ** 20 if rss_peak is not None else None,
+            "rss_growth_mb": (rss_after - rss_before) / 2 ** 20 if None not in (rss_before, rss_after) else None,
+            "open_files_growth": files_after - files_before if None not in (files_before, files_after) else None,
+            "leaked_temp_files": leaked,
+            "phases": {
+                phase: {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                        "p99": percentile(values, 99), "max": max(values)}
+                for phase, values in self.timings.items() if values
+            },
+        }
+
+
+def _ms(seconds) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def _mb(value) -> str:
+    return "n/a" if value is None else f"{value:.1f} MB"
+
+
+def print_report(report: dict, out=sys.stdout):
+    print(f"{report['sessions']} sessions, {report['completed']}/{report['generations']} generations "
+          f"in {report['seconds']:.1f}s ({report['throughput_per_s']:.2f}/s)", file=out)
+    order = list(PHASES) + sorted(p for p in report["phases"] if p not in PHASES)
+    print(f"{'phase':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}", file=out)
+    for phase in order:
+        if phase in report["phases"]:
+            s = report["phases"][phase]
+            print(f"{phase:<16}{s['count']:>7}{_ms(s['p50']):>10}{_ms(s['p95']):>10}{_ms(s['p99']):>10}"
+                  f"{_ms(s['max']):>10}", file=out)
+    print(f"CPU: {report['cpu_seconds']:.1f}s ({report['cpu_utilization']:.0%} of one core)", file=out)
+    growth = report["rss_growth_mb"]
+    print(f"RSS: {_mb(report['rss_before_mb'])} -> {_mb(report['rss_after_mb'])} "
+          f"({'n/a' if growth is None else f'{growth:+.1f} MB'}), peak {_mb(report['rss_peak_mb'])}", file=out)
+    files = report["open_files_growth"]
+    print(f"Open files: {'n/a' if files is None else f'{files:+d}'}, "
+          f"temp files left: {len(report['leaked_temp_files'])}", file=out)
+    for name in report["leaked_temp_files"][:10]:
+        print(f"  {os.path.join(tempfile.gettempdir(), name)}", file=out)
+    for error, count in sorted(report["errors"].items()):
+        print(f"ERROR {error} x{count}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent app sessions against the fake backend.")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="generations per session")
+    parser.add_argument("--formats", default="pdf", help="comma-separated export formats prepared after each generation")
+    parser.add_argument("-n", type=int, default=5, help="questions per generation")
+    parser.add_argument("--structured-ratio", type=float, default=0.5, help="share of JSON-mode generations")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of repeated (cached) requests")
+    parser.add_argument("--think-time", type=float, default=0.0, help="maximum idle seconds before each generation")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which sessions start")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fake model latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake model calls failing with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report as JSON to this file")
+    parser.add_argument("--max-rss-growth", type=float, help="fail if RSS grows by more than this many MB")
+    parser.add_argument("--fail-on-leak", action="store_true", help="fail if temp files or file handles leak")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s) {', '.join(unknown)}; available: {', '.join(EXPORT_FORMATS)}")
+
+    gemini_client.set_backend(FakeBackend(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                          seed=args.seed))
+    test = LoadTest(sessions=args.sessions, iterations=args.iterations, formats=formats, n=args.n,
+                    structured_ratio=args.structured_ratio, repeat_ratio=args.repeat_ratio,
+                    think_time=args.think_time, ramp_up=args.ramp_up, seed=args.seed)
+    try:
+        report = test.run()
+    finally:
+        if _OWN_CACHE_DIR:
+            shutil.rmtree(_OWN_CACHE_DIR, ignore_errors=True)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.max_rss_growth is not None and (report["rss_growth_mb"] or 0) > args.max_rss_growth:
+        failures.append(f"RSS grew by {report['rss_growth_mb']:.1f} MB (limit {args.max_rss_growth} MB)")
+    if args.fail_on_leak and (report["leaked_temp_files"] or (report["open_files_growth"] or 0) > 0):
+        failures.append("temp files or file handles leaked")
+    for failure in failures:
+        print("FAIL " + failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
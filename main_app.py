@@ -1,17 +1,22 @@
-import os
-import json
-import tempfile
+import time
+import uuid
 import streamlit as st
-import io
-import google.generativeai as genai
-from fpdf import FPDF
-from pygments import highlight
-from pygments.lexers import PythonLexer
-from pygments.formatters import ImageFormatter
-from PIL import Image
-from dotenv import load_dotenv
-from question_gen import question_generator_gemini
-from question_gen2 import question_generator_for_ui
+import gemini_client
+import history
+import instrumentation
+import model_router
+from response_cache import get_cache
+from question_bank import get_bank
+from resilience import GenerationError
+from job_queue import DONE, FAILED, QUEUED, QueueFullError, get_queue
+from exporters import EXPORT_FORMATS, content_hash, get_artifact_store, stored_export
+from highlighting import code_language, get_highlight_cache
+from question_parser import IncrementalParser, parse, split_questions
+from rendering import render_events
+from question_gen import LANGUAGES, LEVELS, QUESTION_TYPES, question_generator_gemini
+from question_gen2 import QUESTION_TYPES as JOB_DESCRIPTION_QUESTION_TYPES, question_generator_for_ui
+from prewarm import CATALOG_PATH, load_catalog
+from question_models import QuestionFormatError, questions_to_lines
 
 
 
@@ -19,81 +24,283 @@ st.set_page_config(page_title="Interview Question Generator", layout="centered")
 
 st.title("🗣️ _Job_ _Interview_ _Question_ _Generator_ 📊", )
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+@st.cache_resource
+def init_gemini_client():
+    """
+    Configures the shared Gemini client once per server process, for all sessions.
+    """
+    return gemini_client.configure()
 
-if not GEMINI_API_KEY:
+if not init_gemini_client():
+    init_gemini_client.clear() # Do not remember the failure, so a key added later is picked up
     st.error("Error: The GEMINI_API_KEY environment variable is not configured.")
     st.stop() # Stop execution if no API Key
 
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel(model_name="gemini-1.5-flash") # The Gemini model instance
-
 st.markdown("Explore AI-powered functionalities in one place!")
 
-def code_to_image(code_text: str) -> str:
-    """
-    Renders a code snippet as an image with syntax highlighting using Courier New.
-    """
-    formatter = ImageFormatter(
-        font_name='Courier New',  # compatible with Windows
-        line_numbers=True,
-        style='default',
-        image_format='PNG'
-    )
-    img_data = io.BytesIO()
-    highlight(code_text, PythonLexer(), formatter, outfile=img_data)
-    img_data.seek(0)
-    image = Image.open(img_data)
-    tmp_image_path = tempfile.NamedTemporaryFile(delete=False, suffix='.png').name
-    image.save(tmp_image_path)
-    return tmp_image_path
-
-def render_questions_to_pdf(blocks):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-        
+EXPORT_CACHE_ENTRIES = 32  # artifacts kept in memory across all sessions
+JOB_POLL_INTERVAL = 0.3  # seconds between progress refreshes of a running generation
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner=False)
+def build_export(key, fmt, _text, _events):
+    """
+    Memoized export: `key` is the content hash of `_text`, which is itself left out of cache hashing
+    along with its parsed `_events`. Misses go to the persistent artifact store (filled ahead of time
+    for catalog roles by prewarm.py) before rendering.
+    """
+    return stored_export(_text, fmt, _events)
+
+@st.cache_data(show_spinner=False)
+def role_catalog(path):
+    """
+    Catalog roles offered as presets; their question sets are pre-generated by prewarm.py.
+    """
+    try:
+        return load_catalog(path)
+    except OSError:
+        return []
+
+def catalog_preset(entries, from_job_description):
+    """
+    Offers the catalog roles of a page as presets. Returns the chosen entry, or an empty dict.
+    """
+    entries = [e for e in entries if bool(e["job_description"]) == from_job_description]
+    if not entries:
+        return {}
+    labels = [f"{e['role']} ({e['level']})" for e in entries]
+    choice = st.selectbox("Start from a common role (answers are ready instantly)", ["—"] + labels)
+    return entries[labels.index(choice)] if choice in labels else {}
+
+def render_exports(text, events):
+    """
+    Offers every export format without building any of them up front. An artifact is only
+    rendered once its "Prepare" button is clicked and is then served from cache on reruns.
+    """
+    key = content_hash(text)
+    requested = st.session_state.setdefault("requested_exports", set())
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (fmt, spec) in zip(columns, EXPORT_FORMATS.items()):
+        with column:
+            if (key, fmt) not in requested:
+                if not st.button(f"Prepare {spec.label}", key=f"prepare_{fmt}"):
+                    continue
+                requested.add((key, fmt))
+            st.download_button(
+                label=f"📄 Download {spec.label}",
+                data=build_export(key, fmt, text, events),
+                file_name=f"interview_questions.{spec.extension}",
+                mime=spec.mime,
+                key=f"download_{fmt}"
+            )
+
+def render_questions(questions):
+    """
+    Renders structured Question objects without re-parsing any text, each with a button
+    that regenerates only that question.
+    """
+    for q in questions:
+        st.markdown(f"**Question {q.number}:** {q.text}")
+        st.markdown(f"**Ideal Answer:** {q.ideal_answer.text}")
+        if q.code:
+            st.code(q.code.code, language=code_language(q.code.language))
+        st.markdown(f"**Evaluation:** {q.evaluation.text}")
+        st.button("🔄 Regenerate this question", key=f"regenerate_{q.number}_{q.id}",
+                  on_click=request_regeneration, args=(q.id,))
+
+def session_id():
+    """
+    Identifies this browser session to the shared job queue.
+    """
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+def submit_generation(generator, structured, **kwargs):
+    """
+    Queues a generation for the current page in the process-wide job queue. Any earlier
+    job of the page is cancelled and its result replaced once the new one finishes.
+    """
+    page = st.session_state.page
+    queue = get_queue()
+    if page in st.session_state.jobs:
+        queue.cancel(st.session_state.jobs.pop(page))
+    if "regenerate" not in kwargs:
+        st.session_state.requests[page] = (generator, dict(kwargs))  # reused to regenerate single questions
+    if structured:
+        kwargs["output_format"] = "json"
+    else:
+        kwargs["stream"] = True
     try:
-        font_path = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
-        pdf.add_font("DejaVu", "", font_path, uni=True)
-        pdf.set_font("DejaVu", size=12)
-    except Exception:
-        pdf.set_font("Arial", size=12)
-
-    pdf.multi_cell(0, 10, "Job Interview Questions", align='C')
-    pdf.ln(5)
-
-    code_block = []
-    in_code = False
-
-    for line in blocks:
-        if line.strip().startswith("```"):
-            in_code = not in_code
-            if not in_code:
-                code_image_path = code_to_image("\n".join(code_block))
-                pdf.image(code_image_path, w=180)
-                code_block = []
-            continue
-
-        if in_code:
-            code_block.append(line)
+        st.session_state.jobs[page] = queue.submit(session_id(), generator, **kwargs)
+    except QueueFullError as e:
+        st.warning(str(e))
+
+def request_regeneration(question_id):
+    """
+    Button callback: queues a one-question request replacing `question_id` in the page's result.
+    """
+    page = st.session_state.page
+    generator, kwargs = st.session_state.requests[page]
+    submit_generation(generator, True, **{**kwargs, "n": 1, "regenerate": question_id,
+                                          "questions": st.session_state.results[page]["questions"]})
+
+def question_events(questions, previous=None):
+    """
+    Events of a structured result. Questions that were already in `previous` (same id and
+    number, e.g. all but the regenerated one) reuse their events instead of being parsed again.
+    """
+    known = {}
+    if previous and previous["questions"]:
+        segments = split_questions(previous["events"])
+        if len(segments) == len(previous["questions"]):
+            known = {(q.id, q.number): segment for q, segment in zip(previous["questions"], segments)}
+    events = []
+    for q in questions:
+        segment = known.get((q.id, q.number))
+        events.extend(segment if segment is not None else parse("\n".join(questions_to_lines([q]))))
+    return events
+
+def carry_exports(old_text, new_text):
+    """
+    Marks the export formats prepared for a result as prepared for its patched version too,
+    so their download buttons stay in place. Rebuilding them hits the highlighting cache.
+    """
+    requested = st.session_state.setdefault("requested_exports", set())
+    old_key, new_key = content_hash(old_text), content_hash(new_text)
+    requested |= {(new_key, fmt) for key, fmt in requested if key == old_key}
+
+def wait_for_job(job_id, parser):
+    """
+    Shows the progress of a background job until it finishes and returns it (None if it expired).
+    Streamed chunks are fed to `parser` as they arrive, so each one is parsed exactly once.
+    An interaction during the wait reruns the script, which stops this loop but not the job;
+    the next run simply starts polling again.
+    """
+    queue = get_queue()
+    placeholder = st.empty()
+    job = queue.get(job_id)
+    fed = 0
+    while job is not None and not job.finished:
+        chunks = job.chunks[fed:]
+        parser.feed("".join(chunks))
+        fed += len(chunks)
+        with placeholder.container():
+            if job.status == QUEUED:
+                st.info("⏳ Waiting for a free worker...")
+            elif fed:
+                render_events(parser.events + parser.pending())
+            else:
+                st.info("Generating questions...⏳")
+        time.sleep(JOB_POLL_INTERVAL)
+    if job is not None:
+        parser.feed("".join(job.chunks[fed:]))
+    placeholder.empty()
+    return job
+
+def remember(page, result):
+    """
+    Adds a finished generation of a page to the persistent, searchable history.
+    """
+    generator, kwargs = st.session_state.requests.get(page, (None, {}))
+    history.record_request(generator, kwargs, result["text"], result["events"], result["questions"])
+
+def move_history_page(step):
+    """
+    Button callback: goes one page older (step 1) or newer (step -1) in the history results.
+    """
+    cursors = st.session_state.history_cursors
+    if step > 0:
+        cursors.append(st.session_state.history_last_id)
+    elif len(cursors) > 1:
+        cursors.pop()
+
+def show_history():
+    """
+    Searches the generation history one page at a time. Only the current page is loaded:
+    pages are addressed by the id of the last question of the previous one.
+    """
+    query = st.text_input("🔎 Search questions, answers and code", placeholder="Example: kubernetes pod scheduling")
+    col1, col2, col3, col4 = st.columns(4)
+    role = col1.text_input("Role", placeholder="Any")
+    level = col2.selectbox("Level", ["Any", *LEVELS])
+    types = [*QUESTION_TYPES, *(t for t in JOB_DESCRIPTION_QUESTION_TYPES
+                                if t.lower() not in {q.lower() for q in QUESTION_TYPES})]
+    question_type = col3.selectbox("Type", ["Any", *types])
+    language = col4.selectbox("Language", ["Any", *LANGUAGES])
+    filters = {"query": query, "role": role or None, "level": None if level == "Any" else level,
+               "question_type": None if question_type == "Any" else question_type,
+               "language": None if language == "Any" else language}
+
+    # One cursor per page visited, reset whenever the search changes
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+
+    start = time.perf_counter()
+    hits = history.get_history().search(**filters, before=cursors[-1], limit=history.PAGE_SIZE + 1)
+    elapsed = time.perf_counter() - start
+    has_older = len(hits) > history.PAGE_SIZE
+    hits = hits[:history.PAGE_SIZE]
+    if not hits:
+        st.info("No stored questions match this search." if any(filters.values()) or len(cursors) > 1
+                else "Generated questions will appear here.")
+        return
+    st.session_state.history_last_id = hits[-1].id
+    st.caption(f"Page {len(cursors)} · {len(hits)} questions · {elapsed * 1000:.0f} ms")
+
+    for hit in hits:
+        st.markdown(f"**{hit.question}**")
+        st.caption(f"{hit.role or '—'} · {hit.level or '—'} · {hit.question_type or '—'} · {hit.language or '—'}"
+                   f" · {time.strftime('%Y-%m-%d %H:%M', time.localtime(hit.created_at))}")
+        with st.expander("Answer"):
+            st.markdown(hit.answer)
+            for language, code in hit.code:
+                st.code(code, language=code_language(language))
+
+    col1, col2 = st.columns(2)
+    col1.button("← Newer", key="history_newer", disabled=len(cursors) == 1, on_click=move_history_page, args=(-1,))
+    col2.button("Older →", key="history_older", disabled=not has_older, on_click=move_history_page, args=(1,))
+
+def show_generation():
+    """
+    Shows the current page's running job or, once it finished, its kept result.
+    """
+    page = st.session_state.page
+    results = st.session_state.results
+    if page not in st.session_state.jobs and page not in results:
+        return
+    st.markdown("### ✅ Questions generated:")
+
+    if page in st.session_state.jobs:
+        parser = IncrementalParser()
+        job = wait_for_job(st.session_state.jobs[page], parser)
+        del st.session_state.jobs[page]
+        if job is None:
+            st.warning("The generation expired before it could be shown. Please generate again.")
+        elif job.status == FAILED:
+            if not isinstance(job.error, (GenerationError, QuestionFormatError)):
+                raise job.error
+            st.error(f"❌ Error generating questions:\n\n{job.error}")
+            if "regenerate" not in job.kwargs:
+                results.pop(page, None)  # a failed regeneration leaves the set as it was
+        elif job.status == DONE:
+            if isinstance(job.result, list):
+                previous = results.get(page)
+                text = "\n".join(questions_to_lines(job.result))
+                results[page] = {"text": text, "questions": job.result,
+                                 "events": question_events(job.result, previous)}
+                if previous:
+                    carry_exports(previous["text"], text)
+            else:
+                parser.close()
+                results[page] = {"text": job.result, "questions": None, "events": parser.events}
+            remember(page, results[page])
+
+    if page in results:
+        if results[page]["questions"]:
+            render_questions(results[page]["questions"])
         else:
-            if line.strip():
-                pdf.multi_cell(0, 10, line.strip())
-                pdf.ln(1)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        pdf.output(tmp_file.name)
-        st.download_button(
-            label="📄 Download questions in PDF",
-            data=open(tmp_file.name, "rb").read(),
-            file_name="interview_questions.pdf",
-            mime="application/pdf"
-        )
-        return tmp_file.name
-    
-    os.remove(tmp_file.name)
+            render_events(results[page]["events"])
+        render_exports(results[page]["text"], results[page]["events"])
 
 # Sidebar for navigation 
 st.sidebar.title("Main Menu 🧭")
@@ -102,6 +309,12 @@ st.sidebar.markdown("---") # Visual separator
 # We use st.session_state to maintain the state of the current page
 if 'page' not in st.session_state:
     st.session_state.page = 'welcome' # Default page
+if 'results' not in st.session_state:
+    st.session_state.results = {} # Last generation per page, kept across reruns
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {} # Background job id per page, while it runs
+if 'requests' not in st.session_state:
+    st.session_state.requests = {} # Generator and arguments of the last generation per page
 
 # Navigation buttons in the sidebar
 if st.sidebar.button("🏠 Home", key="nav_home"):
@@ -110,6 +323,13 @@ if st.sidebar.button("📝 Question generator using skills", key="nav_questions"
     st.session_state.page = 'question_generator_gemini'
 if st.sidebar.button("📋 Question generator using the job description", key="nav_other_feature"):
     st.session_state.page = 'question_generator_for_ui'
+if st.sidebar.button("🗂️ History", key="nav_history"):
+    st.session_state.page = 'history'
+
+# Hidden admin page, only reachable with ?admin=1 in the URL
+if st.query_params.get("admin") == "1":
+    if st.sidebar.button("📈 Admin: latency and tokens", key="nav_admin"):
+        st.session_state.page = 'admin'
 
 st.sidebar.markdown("---")
 st.sidebar.info("Select a menu option to navigate through the application.")
@@ -125,6 +345,7 @@ if st.session_state.page == 'welcome':
 
         * **📝 Question generator using skills:** Create custom questions for your selection processes, taking into account the required skills.
         * **📋 Question generator using the job description:** Create custom questions for your selection processes, based on the job descriptions posted.
+        * **🗂️ History:** Find any question generated before, by text, role, level, type or language.
 
         We hope you find it very useful!
     """)
@@ -132,75 +353,68 @@ if st.session_state.page == 'welcome':
 elif st.session_state.page == 'question_generator_gemini':
     st.title("📝 Question generator using skills")
     st.write("Configure parameters to generate role-specific questions.")
+    preset = catalog_preset(role_catalog(CATALOG_PATH), from_job_description=False)
 
     col1, col2 = st.columns(2)
     
     with col1:
-        rol = st.text_input("Job position 🔍", placeholder="Example: Data Analyst")
-        level = st.selectbox("Candidate level", ["Entry", "Junior", "Mid", "Senior"])
-        type = st.selectbox("Type of questions", ["Technique", "Behavioral", "Logical", "Mixed"])   
-        n_questions = st.slider("#️⃣ Number of questions", 1, 10, 5)
-        language = st.selectbox("Language you prefer", ["English", "French", "Spanish"])
+        rol = st.text_input("Job position 🔍", value=preset.get("role", ""), placeholder="Example: Data Analyst")
+        level = st.selectbox("Candidate level", LEVELS, index=LEVELS.index(preset["level"]) if preset.get("level") in LEVELS else 0)
+        type = st.selectbox("Type of questions", QUESTION_TYPES)   
+        n_questions = st.slider("#️⃣ Number of questions", 1, 10, min(preset.get("n", 5), 10))
+        language = st.selectbox("Language you prefer", LANGUAGES)
 
     with col2:
-        level_description = st.text_input("More detailed description of the candidate's level", placeholder="Example: 'recent graduate with little experience', 'professional with 5 years of experience in the sector'.")
-        responsibilities = st.text_input("The 3-5 main responsibilities of the position are: ", placeholder="Example: 'Cleaning data sets', 'Developing predictive models using statistical techniques.'") 
-        technical_skills = st.text_input("The 3-5 key technical skills or knowledge required are: ", placeholder="Example: SQL, Python, etc.")
-        soft_skills = st.text_input("The 3-5 soft skills or competencies important for success in the position are: ", placeholder="Example: Communication, Collaboration, Critical Thinking,..")
+        level_description = st.text_input("More detailed description of the candidate's level", value=preset.get("level_description", ""), placeholder="Example: 'recent graduate with little experience', 'professional with 5 years of experience in the sector'.")
+        responsibilities = st.text_input("The 3-5 main responsibilities of the position are: ", value=preset.get("responsibilities", ""), placeholder="Example: 'Cleaning data sets', 'Developing predictive models using statistical techniques.'") 
+        technical_skills = st.text_input("The 3-5 key technical skills or knowledge required are: ", value=preset.get("technical_skills", ""), placeholder="Example: SQL, Python, etc.")
+        soft_skills = st.text_input("The 3-5 soft skills or competencies important for success in the position are: ", value=preset.get("soft_skills", ""), placeholder="Example: Communication, Collaboration, Critical Thinking,..")
+        bypass_cache = st.checkbox("Force a fresh generation (ignore cached results)")
+        structured = st.checkbox("Structured output (JSON mode)")
+        fan_out = st.checkbox("Fan-out: generate focused parts in parallel (faster for many questions)")
+        use_bank = st.checkbox("Reuse similar questions from the question bank (structured or fan-out only)",
+                               disabled=not (structured or fan_out))
 
 # Button to generate questions
     if st.button("Generate questions"):
         if not rol:
             st.warning("Please enter a role.")
         else:
-            with st.spinner("Generating questions...⏳"):
-                resultado = question_generator_gemini(
-                    rol=rol,
-                    level=level,
-                    level_description=level_description,
-                    type=type,
-                    responsibilities=responsibilities,
-                    technical_skills=technical_skills,
-                    soft_skills=soft_skills,
-                    n=n_questions,
-                    language=language
-                )
-
-            st.markdown("### ✅ Questions generated:")
-        
-            blocks = resultado.split('\n')
-            in_code_block = False
-            code_lines = []
-
-            for line in blocks:
-                
-                if line.strip().startswith("```"):
-                    in_code_block = not in_code_block
-                    if not in_code_block:
-                    
-                        st.code("\n".join(code_lines), language="python")
-                        code_lines = []
-                    continue
-
-                if in_code_block:
-                    code_lines.append(line)
-                else:
-                    if line.strip():  # línea no vacía
-                        st.markdown(line.strip())
-            
-            pdf_path = render_questions_to_pdf(blocks)
+            submit_generation(
+                question_generator_gemini,
+                structured=structured or fan_out,
+                rol=rol,
+                level=level,
+                level_description=level_description,
+                type=type,
+                responsibilities=responsibilities,
+                technical_skills=technical_skills,
+                soft_skills=soft_skills,
+                n=n_questions,
+                language=language,
+                bypass_cache=bypass_cache,
+                use_bank=use_bank,
+                fan_out=fan_out
+            )
+
+    show_generation()
 
 elif st.session_state.page == 'question_generator_for_ui':
     st.title("⚙️ Otra Funcionalidad de IA")
     st.write("Esta sección demuestra las capacidades de tu segundo backend de IA.")
 
-    rol = st.text_input("Job position 🔍", placeholder="Example: Data Analyst")
-    level = st.selectbox("Candidate level", ["Entry", "Junior", "Mid", "Senior"])
-    type = st.selectbox("Type of questions", ["technical", "behavioral"])
-    language = st.selectbox("Language you prefer", ["English", "French", "Spanish"])
-    n_questions = st.slider("#️⃣ Number of questions", 1, 10, 5)
-    level_description = st.text_input("More detailed description of the candidate's level", placeholder="Example: 'recent graduate with little experience', 'professional with 5 years of experience in the sector'.")
-    job_description = st.text_area("Full job description or key responsibilities", placeholder="Include main responsibilities, technical and soft skills required...")
+    preset = catalog_preset(role_catalog(CATALOG_PATH), from_job_description=True)
+
+    rol = st.text_input("Job position 🔍", value=preset.get("role", ""), placeholder="Example: Data Analyst")
+    level = st.selectbox("Candidate level", LEVELS, index=LEVELS.index(preset["level"]) if preset.get("level") in LEVELS else 0)
+    type = st.selectbox("Type of questions", JOB_DESCRIPTION_QUESTION_TYPES)
+    language = st.selectbox("Language you prefer", LANGUAGES)
+    n_questions = st.slider("#️⃣ Number of questions", 1, 10, min(preset.get("n", 5), 10))
+    level_description = st.text_input("More detailed description of the candidate's level", value=preset.get("level_description", ""), placeholder="Example: 'recent graduate with little experience', 'professional with 5 years of experience in the sector'.")
+    job_description = st.text_area("Full job description or key responsibilities", value=preset.get("job_description", ""), placeholder="Include main responsibilities, technical and soft skills required...")
+    bypass_cache = st.checkbox("Force a fresh generation (ignore cached results)")
+    structured = st.checkbox("Structured output (JSON mode)")
+    fan_out = st.checkbox("Fan-out: generate focused parts in parallel (faster for many questions)")
 
     # Botón para generar preguntas
     if st.button("Generate questions"):
@@ -209,35 +423,46 @@ elif st.session_state.page == 'question_generator_for_ui':
         elif not job_description:
             st.warning("Please provide a job description.")
         else:
-            with st.spinner("Generating questions...⏳"):
-                resultado = question_generator_for_ui(
-                    job_description=job_description,
-                    role=rol,
-                    level=level,
-                    previous_experience=level_description,
-                    question_type=type,
-                    language=language,
-                    n=n_questions
-                )
-
-            st.markdown("### ✅ Questions generated:")
-
-            blocks = resultado.split('\n')
-            in_code_block = False
-            code_lines = []
-
-            for line in blocks:
-                if line.strip().startswith("```"):
-                    in_code_block = not in_code_block
-                    if not in_code_block:
-                        st.code("\n".join(code_lines), language="python")
-                        code_lines = []
-                    continue
-
-                if in_code_block:
-                    code_lines.append(line)
-                else:
-                    if line.strip():
-                        st.markdown(line.strip())
+            submit_generation(
+                question_generator_for_ui,
+                structured=structured or fan_out,
+                job_description=job_description,
+                role=rol,
+                level=level,
+                previous_experience=level_description,
+                question_type=type,
+                language=language,
+                n=n_questions,
+                bypass_cache=bypass_cache,
+                fan_out=fan_out
+            )
+
+    show_generation()
+
+elif st.session_state.page == 'history':
+    st.title("🗂️ Generation history")
+    st.write("Every question set generated here is kept. Search it by text, role, level, type or language.")
+    show_history()
+
+elif st.session_state.page == 'admin' and st.query_params.get("admin") == "1":
+    st.title("📈 Latency and token usage")
+    st.caption(f"Last {len(instrumentation.records())} instrumented calls in this server process.")
+
+    group_by = st.selectbox("Group by", ["question_type", "language", "model", "model_tier", "output_format"])
+    rows = instrumentation.summary(group_by=group_by)
+    if rows:
+        st.dataframe(rows)
+    else:
+        st.info("No calls recorded yet.")
+
+    st.markdown("**Response cache:** " + ", ".join(f"{k}: {v}" for k, v in get_cache().stats().items()))
+    st.markdown("**Job queue:** " + ", ".join(f"{k}: {v}" for k, v in get_queue().stats().items()))
+    st.markdown("**Question bank:** " + ", ".join(f"{k}: {v}" for k, v in get_bank().stats().items()))
+    st.markdown("**Highlight cache:** " + ", ".join(f"{k}: {v}" for k, v in get_highlight_cache().stats().items()))
+    st.markdown("**Pre-rendered artifacts:** " + ", ".join(f"{k}: {v}" for k, v in get_artifact_store().stats().items()))
+    st.markdown("**History:** " + ", ".join(f"{k}: {v}" for k, v in history.get_history().stats().items()))
+    st.markdown("**Model router:** " + ", ".join(f"{k}: {v}" for k, v in model_router.stats().items()))
 
-            pdf_path = render_questions_to_pdf(blocks)
+    col1, col2 = st.columns(2)
+    col1.download_button("Download JSONL", instrumentation.export_jsonl(), file_name="qg_metrics.jsonl", mime="application/jsonl")
+    col2.download_button("Download Prometheus metrics", instrumentation.export_prometheus(), file_name="qg_metrics.prom", mime="text/plain")
@@ -0,0 +1,363 @@
+"""
+Model cascade under both generators: a cheap model first, a stronger one only when needed.
+
+Tiers, cheapest first, are lite (QG_MODEL_LITE), standard (QG_MODEL) and strong
+(QG_MODEL_STRONG). A request starts on a tier picked from its question type, its
+question count and the length of its job description: short behavioral requests on
+lite, very large ones on strong, everything else on standard. Its output is then
+checked cheaply, without another model call: the number of questions, a code block
+when a coding question is required, and the language. An output failing the checks
+is not cached and the request is repeated on the next tier; the last tier's output is
+always accepted. Requests that had to be escalated start on the tier that passed the
+next time they are made (per process).
+
+Every attempt is stored as a "model_route" instrumentation record (tier, model,
+outcome, problems, seconds, tokens and estimated cost), and the generator's own record
+gets the final model, tier and escalation count.
+
+Requests with an explicit model_name, and all requests when QG_ROUTER=0, are not routed.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import NamedTuple
+
+import gemini_client
+import instrumentation
+from question_models import QuestionFormatError
+from question_parser import CODE, HEADING, QUESTION, TEXT, parse
+
+ROUTER = os.getenv("QG_ROUTER", "1") == "1"
+LITE_MODEL = os.getenv("QG_MODEL_LITE", "gemini-1.5-flash-8b")
+STRONG_MODEL = os.getenv("QG_MODEL_STRONG", "gemini-1.5-pro")
+LITE_MAX_N = int(os.getenv("QG_ROUTER_LITE_MAX_N", 5))
+LITE_MAX_JD_TOKENS = int(os.getenv("QG_ROUTER_LITE_MAX_JD_TOKENS", 800))
+STRONG_MIN_N = int(os.getenv("QG_ROUTER_STRONG_MIN_N", 20))
+STRONG_MIN_JD_TOKENS = int(os.getenv("QG_ROUTER_STRONG_MIN_JD_TOKENS", 3000))
+MEMO_ENTRIES = 1024
+
+# USD per million input / output tokens (prompts up to 128k tokens), for cost estimates only
+PRICES = {
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+LITE_TYPES = ("behavioral", "behavioural", "comportamental", "comportemental")
+# Only technical requests: the templates ask for a coding question for those alone (not for "Mixed")
+CODING_TYPES = ("technique", "technical", "técnica", "tecnica")
+
+# Programming languages whose mention makes the templates ask for a coding question
+_PROGRAMMING_LANGUAGE = re.compile(
+    r"(?<![\w#+])(python|java|javascript|typescript|sql|golang|rust|ruby|php|kotlin|swift|scala|"
+    r"bash|c\+\+|c#|\.net|matlab|perl|haskell|dart|elixir)(?![\w#+])",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Frequent function words that tell the supported output languages apart
+_STOPWORDS = {
+    "English": frozenset("the and of to is in that for with you your what how this are be it as".split()),
+    "Spanish": frozenset("el los las del y por para con es su como se al una lo más cómo qué".split()),
+    "French": frozenset("le les des du et pour avec est sur dans vous qui au aux une ce pas comment".split()),
+}
+_LANGUAGE_ALIASES = {"español": "Spanish", "espanol": "Spanish", "français": "French", "francais": "French",
+                     "inglés": "English", "anglais": "English"}
+_STOPWORD_LANGUAGE = {word: language for language, words in _STOPWORDS.items() for word in words}
+MIN_LANGUAGE_EVIDENCE = 5  # stopwords needed before the language of an output is judged
+
+
+class Tier(NamedTuple):
+    name: str
+    model: str
+    input_price: float = None  # USD per million tokens, None if unknown
+    output_price: float = None
+
+    def cost(self, prompt_tokens: int, output_tokens: int) -> float:
+        if self.input_price is None:
+            return None
+        return (prompt_tokens * self.input_price + output_tokens * self.output_price) / 1e6
+
+
+def _tiers() -> tuple:
+    tiers = []
+    for name, model in (("lite", LITE_MODEL), ("standard", gemini_client.DEFAULT_MODEL), ("strong", STRONG_MODEL)):
+        # A tier configured with the same model as the one below it would only repeat the same call
+        if tiers and tiers[-1].model == model:
+            continue
+        tiers.append(Tier(name, model, *PRICES.get(model, (None, None))))
+    return tuple(tiers)
+
+
+TIERS = _tiers()
+STANDARD = next(i for i, t in enumerate(TIERS) if t.model == gemini_client.DEFAULT_MODEL)
+
+
+@dataclass(slots=True)
+class RouteRequest:
+    """
+    What the router needs to know about a generation request.
+
+    Parameters:
+        - question_type: The requested question type, e.g. "Behavioral" or "technical".
+        - n: Number of questions the output must contain.
+        - language: Requested output language; only English, Spanish and French are checked.
+        - requires_code: True if at least one question must come with a code block (see requires_code).
+        - jd_tokens: Tokens of the job description in the prompt, 0 without one.
+        - key: Text identifying repeats of this request (e.g. its prompt), for the escalation memo;
+          None disables the memo.
+    """
+    question_type: str
+    n: int
+    language: str = None
+    requires_code: bool = False
+    jd_tokens: int = 0
+    key: str = None
+
+
+class OutputRejected(ValueError):
+    """
+    Raised by a route check when an output fails validation; carries the list of problems.
+    """
+
+    def __init__(self, problems: list):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def mentions_code(text: str) -> bool:
+    return bool(text) and _PROGRAMMING_LANGUAGE.search(text) is not None
+
+
+def requires_code(question_type: str, text: str) -> bool:
+    """
+    True if the prompt templates ask for a coding question: a technical request
+    whose skills or job description (`text`) name a programming language.
+    """
+    return (question_type or "").strip().lower() in CODING_TYPES and mentions_code(text)
+
+
+def detect_language(text: str) -> str:
+    """
+    Guesses English, Spanish or French from stopword counts; None if there is too little evidence.
+    """
+    counts = dict.fromkeys(_STOPWORDS, 0)
+    for word in _WORD.findall(text.lower()):
+        language = _STOPWORD_LANGUAGE.get(word)
+        if language is not None:
+            counts[language] += 1
+    language, count = max(counts.items(), key=lambda kv: kv[1])
+    return language if count >= MIN_LANGUAGE_EVIDENCE else None
+
+
+def _language(name: str) -> str:
+    name = (name or "").strip()
+    return _LANGUAGE_ALIASES.get(name.lower(), name.capitalize())
+
+
+def _problems(count: int, has_code: bool, prose: str, request: RouteRequest) -> list:
+    problems = []
+    if count != request.n:
+        problems.append(f"{count} questions instead of {request.n}")
+    if request.requires_code and not has_code:
+        problems.append("no code block although a coding question is required")
+    expected = _language(request.language)
+    if expected in _STOPWORDS:
+        detected = detect_language(prose)
+        if detected is not None and detected != expected:
+            problems.append(f"written in {detected} instead of {expected}")
+    return problems
+
+
+def check_text(text: str, request: RouteRequest) -> list:
+    """
+    Checks a text-mode output. Returns the list of problems, empty if it passes.
+    """
+    events = parse(text)
+    return _problems(
+        count=sum(1 for e in events if e.kind == QUESTION),
+        has_code=any(e.kind == CODE for e in events),
+        prose=" ".join(e.text for e in events if e.kind in (TEXT, HEADING)),
+        request=request,
+    )
+
+
+def check_questions(questions, request: RouteRequest) -> list:
+    """
+    Checks structured output (a list of Question objects). Returns the list of problems, empty if it passes.
+    """
+    return _problems(
+        count=len(questions),
+        has_code=any(q.code for q in questions),
+        prose=" ".join(f"{q.text} {q.ideal_answer.text} {q.evaluation.text}" for q in questions),
+        request=request,
+    )
+
+
+def check_output(output, request: RouteRequest) -> list:
+    return check_text(output, request) if isinstance(output, str) else check_questions(output, request)
+
+
+def select_tier(request: RouteRequest) -> int:
+    """
+    Index in TIERS of the tier a request starts on, before any escalation.
+    """
+    question_type = (request.question_type or "").strip().lower()
+    if request.n >= STRONG_MIN_N or request.jd_tokens >= STRONG_MIN_JD_TOKENS:
+        return len(TIERS) - 1
+    if (question_type in LITE_TYPES and request.n <= LITE_MAX_N
+            and request.jd_tokens <= LITE_MAX_JD_TOKENS and not request.requires_code):
+        return 0
+    return STANDARD
+
+
+_memo = OrderedDict()  # hashed request key -> index of the tier that passed after escalating
+_memo_lock = threading.Lock()
+
+
+def _memo_key(request: RouteRequest) -> str:
+    if request.key is None:
+        return None
+    return hashlib.sha1(f"{request.n}\0{request.key}".encode("utf-8")).hexdigest()
+
+
+def _start(request: RouteRequest) -> int:
+    index = select_tier(request)
+    key = _memo_key(request)
+    if key is not None:
+        with _memo_lock:
+            remembered = _memo.get(key)
+        if remembered is not None:
+            index = max(index, remembered)
+    return index
+
+
+def _remember(request: RouteRequest, index: int):
+    key = _memo_key(request)
+    if key is None:
+        return
+    with _memo_lock:
+        _memo[key] = index
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def _log_attempt(request: RouteRequest, tier: Tier, outcome: str, seconds: float, before: tuple, problems=()):
+    prompt_tokens, output_tokens = (after - start for after, start in zip(instrumentation.current_usage(), before))
+    cost = tier.cost(prompt_tokens, output_tokens)
+    instrumentation.store_record("model_route", seconds, question_type=request.question_type, n=request.n,
+                                 language=request.language, model=tier.model, model_tier=tier.name,
+                                 outcome=outcome, problems="; ".join(problems) or None,
+                                 prompt_tokens=prompt_tokens or None, output_tokens=output_tokens or None,
+                                 cost_usd=cost)
+    return cost or 0.0
+
+
+def run(request: RouteRequest, attempt, model_name: str = None):
+    """
+    Runs a request on the cheapest suitable tier, escalating while its output fails the checks.
+
+    Parameters:
+        - request: The request's profile.
+        - attempt: Callable (model_name, check) making one attempt on that model and returning its
+          output (text or a list of Question objects). `check` takes the output, raises OutputRejected
+          if it fails and returns it otherwise; pass it as the response cache's `validate` where possible,
+          so rejected outputs are not cached.
+        - model_name: An explicit model; the request is then sent to it as is, without checks.
+
+    Returns:
+        - The first accepted output.
+
+    Raises:
+        - Whatever `attempt` raises. OutputRejected never escapes, and question_models.QuestionFormatError
+          only when the last tier's output cannot be parsed either.
+    """
+    if model_name or not ROUTER:
+        return attempt(model_name, lambda output: output)
+
+    first = index = _start(request)
+    total_cost = 0.0
+    while True:
+        tier = TIERS[index]
+        last = index == len(TIERS) - 1
+        found = []
+
+        def check(output):
+            problems = check_output(output, request)
+            if problems and not last:
+                raise OutputRejected(problems)
+            found[:] = problems  # the last tier's output is accepted as is
+            return output
+
+        before = instrumentation.current_usage()
+        start = time.perf_counter()
+        try:
+            output = attempt(tier.model, check)
+        except (OutputRejected, QuestionFormatError) as e:
+            problems = e.problems if isinstance(e, OutputRejected) else [str(e)]
+            total_cost += _log_attempt(request, tier, "rejected", time.perf_counter() - start, before, problems)
+            if last:
+                raise
+            index += 1
+            continue
+        except Exception:
+            _log_attempt(request, tier, "error", time.perf_counter() - start, before)
+            raise
+        total_cost += _log_attempt(request, tier, "accepted", time.perf_counter() - start, before, found)
+        if index > first:
+            _remember(request, index)
+        instrumentation.annotate(model=tier.model, model_tier=tier.name, escalations=index - first,
+                                 cost_usd=total_cost if tier.input_price is not None else None)
+        return output
+
+
+def run_stream(request: RouteRequest, produce, model_name: str = None):
+    """
+    Streaming counterpart of run: yields the chunks of `produce(model_name)`.
+
+    Streamed text is shown as it arrives and cannot be taken back, so a stream runs on a
+    single tier, never below standard, and is checked once complete: a failing stream is
+    logged and makes the next identical request start one tier higher.
+    """
+    if model_name or not ROUTER:
+        yield from produce(model_name)
+        return
+
+    index = max(_start(request), STANDARD)
+    tier = TIERS[index]
+    instrumentation.annotate(model=tier.model, model_tier=tier.name, escalations=0)
+    before = instrumentation.current_usage()
+    start = time.perf_counter()
+    parts = []
+    try:
+        for chunk in produce(tier.model):
+            parts.append(chunk)
+            yield chunk
+    except Exception:
+        _log_attempt(request, tier, "error", time.perf_counter() - start, before)
+        raise
+    problems = check_text("".join(parts), request)
+    outcome = "rejected" if problems else "accepted"
+    cost = _log_attempt(request, tier, outcome, time.perf_counter() - start, before, problems)
+    instrumentation.annotate(cost_usd=cost if tier.input_price is not None else None)
+    if problems and index < len(TIERS) - 1:
+        _remember(request, index + 1)
+
+
+def for_regeneration(request: RouteRequest) -> RouteRequest:
+    """
+    Profile of a single-question regeneration of `request`: one question, no code requirement, no memo.
+    """
+    return replace(request, n=1, requires_code=False, key=None)
+
+
+def stats() -> dict:
+    with _memo_lock:
+        escalated = len(_memo)
+    return {"enabled": ROUTER, "tiers": ", ".join(f"{t.name}={t.model}" for t in TIERS),
+            "escalated_requests": escalated}
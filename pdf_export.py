@@ -0,0 +1,172 @@
+import io
+import os
+from functools import lru_cache
+
+from fpdf import FPDF, FPDF_VERSION
+from pypdf import PdfWriter
+
+from highlighting import highlight
+from instrumentation import instrumented
+from question_parser import CODE, HEADING, TEXT
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DejaVuSans.ttf")
+TITLE = "Job Interview Questions"
+
+# Typographic punctuation the model likes to emit, mapped to Latin-1 so that most
+# documents can use the built-in PDF fonts instead of embedding DejaVuSans
+_PUNCTUATION = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2026": "...", "\u2022": "-", "\u00a0": " ",
+})
+
+@lru_cache(maxsize=1)
+def _unicode_font_available() -> bool:
+    return os.path.exists(FONT_PATH)
+
+
+def _is_latin1(text: str) -> bool:
+    try:
+        text.encode("latin-1")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def _latin1(text: str) -> str:
+    return text.translate(_PUNCTUATION).encode("latin-1", "replace").decode("latin-1")
+
+
+def _pdf_bytes(pdf) -> bytes:
+    if FPDF_VERSION.startswith("1."):
+        return pdf.output(dest="S").encode("latin-1")
+    return bytes(pdf.output())
+
+
+def _new_document(needs_unicode: bool):
+    """
+    Creates a document and returns it with the family to use for body text.
+    DejaVuSans is only parsed and embedded when the text cannot be written in Latin-1.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    family = "Helvetica"
+    if needs_unicode and _unicode_font_available():
+        try:
+            # pyfpdf 1.x needs uni=True for TrueType fonts; fpdf2 no longer accepts it
+            extra = {"uni": True} if FPDF_VERSION.startswith("1.") else {}
+            pdf.add_font("DejaVu", "", FONT_PATH, **extra)
+            family = "DejaVu"
+        except Exception:
+            pass
+    return pdf, family
+
+
+def _write_code(pdf, code: str, language: str = None, line_height: float = 5):
+    """
+    Writes a highlighted code block as native PDF text runs in Courier, colored
+    from the memoized runs of highlighting.highlight for the fence's language.
+    """
+    left = pdf.l_margin
+    pdf.set_left_margin(left + 5)
+    pdf.set_x(left + 5)
+    for value, r, g, b, bold in highlight(code, language):
+        pdf.set_text_color(r, g, b)
+        pdf.set_font("Courier", "B" if bold else "", 9)
+        pdf.write(line_height, _latin1(value))
+    pdf.set_left_margin(left)
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(line_height + 2)
+
+
+def _needs_unicode(events) -> bool:
+    """
+    True if the text outside code blocks cannot be written with the built-in Latin-1 fonts.
+    """
+    return not _is_latin1("".join(e.text.translate(_PUNCTUATION) for e in events if e.kind in (TEXT, HEADING)))
+
+
+def _write_events(pdf, family: str, events):
+    """
+    Writes text and heading events as paragraphs, and code events as highlighted blocks.
+    """
+    write_text = (lambda s: s) if family == "DejaVu" else _latin1
+    pdf.set_font(family, size=12)
+
+    for event in events:
+        if event.kind == CODE:
+            _write_code(pdf, event.text, event.language)
+            pdf.set_font(family, size=12)
+        elif event.kind == HEADING:
+            pdf.set_font(family, size=13)
+            pdf.multi_cell(0, 10, write_text(event.text.translate(_PUNCTUATION)))
+            pdf.set_font(family, size=12)
+            pdf.ln(1)
+        elif event.kind == TEXT:
+            pdf.multi_cell(0, 10, write_text(event.text.translate(_PUNCTUATION)))
+            pdf.ln(1)
+
+
+@instrumented("render_questions_to_pdf")
+def render_questions_to_pdf(events) -> bytes:
+    """
+    Renders generated questions to a PDF in memory.
+
+    Parameters:
+        - events: The generated text parsed by question_parser.parse.
+
+    Returns:
+        - The PDF document as bytes.
+    """
+    pdf, family = _new_document(_needs_unicode(events))
+
+    pdf.set_font(family, size=12)
+    pdf.multi_cell(0, 10, TITLE, align='C')
+    pdf.ln(5)
+
+    _write_events(pdf, family, events)
+    return _pdf_bytes(pdf)
+
+
+@instrumented("render_booklet_to_pdf")
+def render_booklet_to_pdf(sections, title: str = TITLE) -> bytes:
+    """
+    Renders several question sets into one PDF, each starting on a new page under its heading.
+
+    Parameters:
+        - sections: (heading, events) pairs, events being one generated set parsed by question_parser.parse.
+        - title: Title of the first page; None for none (e.g. a later part of a booklet rendered in parts).
+
+    Returns:
+        - The PDF document as bytes.
+    """
+    sections = list(sections)
+    needs_unicode = any(_needs_unicode(events) or not _is_latin1(heading.translate(_PUNCTUATION))
+                        for heading, events in sections)
+    pdf, family = _new_document(needs_unicode)
+    write_text = (lambda s: s) if family == "DejaVu" else _latin1
+
+    if title is not None:
+        pdf.set_font(family, size=16)
+        pdf.multi_cell(0, 12, write_text(title), align='C')
+        pdf.ln(5)
+    for index, (heading, events) in enumerate(sections):
+        if index:
+            pdf.add_page()
+        pdf.set_font(family, size=14)
+        pdf.multi_cell(0, 10, write_text(heading.translate(_PUNCTUATION)))
+        pdf.ln(3)
+        _write_events(pdf, family, events)
+    return _pdf_bytes(pdf)
+
+
+def merge_pdfs(parts) -> bytes:
+    """
+    Concatenates PDF documents (bytes), in order, into one.
+    """
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,308 @@
+"""
+Off-peak pre-warming of question sets for the roles recruiters ask for most.
+
+Reads a role catalog and generates, for every catalog role, each question type and
+each language offered by the app, exactly the request the app would send, so the
+responses land in the response cache under the keys the app looks up first. The
+PDF (and any other requested) artifacts are rendered at the same time into the
+artifact store the app's download buttons read (exporters.stored_export). A
+catalog role asked for at peak time is then answered from local stores.
+
+Run it from cron, e.g. every night:
+
+    python prewarm.py role_catalog.csv --rpm 30 --max-requests 500 --stop-at 07:00
+
+The catalog is a CSV or JSONL file with one role per row. Columns: role, level,
+level_description, responsibilities, technical_skills, soft_skills (skills page),
+or role, level, level_description, job_description (job-description page); optional
+n (default 5, the app's default), types and languages ("|"-separated, default: all).
+
+Warmed sets are recorded in CACHE_DIR/prewarm.sqlite3, with the response cache keys
+and artifacts they produced, and skipped until they are about to expire from the
+response cache; then they are generated fresh again. A set whose response or
+artifact was evicted in the meantime (both stores are size-bounded) is warmed again
+on the next run.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+import prompt_templates
+from batch_gen import RateLimiter, load_specs
+from exporters import EXPORT_FORMATS, content_hash, get_artifact_store, stored_export
+from question_gen import LANGUAGES, QUESTION_TYPES, question_generator_gemini
+from question_gen2 import QUESTION_TYPES as JOB_DESCRIPTION_QUESTION_TYPES, question_generator_for_ui
+from question_models import questions_to_lines
+from question_parser import parse
+from response_cache import CACHE_DIR, DEFAULT_TTL, ResponseCache, get_cache, track_writes
+
+CATALOG_PATH = os.getenv("QG_ROLE_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "role_catalog.csv"))
+DEFAULT_N = 5  # the app's default number of questions
+REFRESH_MARGIN = 24 * 3600  # seconds before a warmed response expires from the cache that it is warmed again
+MODES = ("text", "json")  # the app's default streamed text, and its structured output option
+
+CATALOG_FIELDS = ("role", "level", "level_description", "responsibilities", "technical_skills", "soft_skills",
+                  "job_description")
+
+
+def _choices(value) -> list:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split("|") if v.strip()]
+
+
+def load_catalog(path: str = CATALOG_PATH) -> list:
+    """
+    Reads a role catalog (see the module docstring). Rows without a role are ignored.
+
+    Returns:
+        - A list of dicts with every CATALOG_FIELDS key (empty strings when absent), "n",
+          "types" and "languages" (empty lists meaning all).
+    """
+    entries = []
+    for row in load_specs(path):
+        entry = {key: str(row.get(key) or "").strip() for key in CATALOG_FIELDS}
+        entry["role"] = entry["role"] or str(row.get("rol") or "").strip()
+        entry["level_description"] = entry["level_description"] or str(row.get("previous_experience") or "").strip()
+        if not entry["role"]:
+            continue
+        entry["n"] = int(row.get("n") or DEFAULT_N)
+        entry["types"] = _choices(row.get("types"))
+        entry["languages"] = _choices(row.get("languages"))
+        entries.append(entry)
+    return entries
+
+
+@dataclass
+class WarmSpec:
+    """
+    One request to warm: the generator, its arguments as main_app sends them, and the output mode.
+    """
+    generator: object
+    kwargs: dict
+    mode: str = "text"
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps([self.generator.__name__, self.mode, self.kwargs, prompt_templates.versions()],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def label(self) -> str:
+        kwargs = self.kwargs
+        return (f"{kwargs.get('rol') or kwargs.get('role')} / {kwargs['level']} / "
+                f"{kwargs.get('type') or kwargs.get('question_type')} / {kwargs['language']} ({self.mode})")
+
+
+def expand(entries, languages=LANGUAGES, modes=("text",)) -> list:
+    """
+    Turns catalog entries into one WarmSpec per question type, language and mode.
+    """
+    specs = []
+    for entry in entries:
+        from_job_description = bool(entry["job_description"])
+        types = entry["types"] or (JOB_DESCRIPTION_QUESTION_TYPES if from_job_description else QUESTION_TYPES)
+        for question_type in types:
+            for language in entry["languages"] or languages:
+                if from_job_description:
+                    generator = question_generator_for_ui
+                    kwargs = {"job_description": entry["job_description"], "role": entry["role"],
+                              "level": entry["level"], "previous_experience": entry["level_description"],
+                              "question_type": question_type, "language": language, "n": entry["n"]}
+                else:
+                    generator = question_generator_gemini
+                    kwargs = {"rol": entry["role"], "level": entry["level"],
+                              "level_description": entry["level_description"], "type": question_type,
+                              "responsibilities": entry["responsibilities"],
+                              "technical_skills": entry["technical_skills"], "soft_skills": entry["soft_skills"],
+                              "language": language, "n": entry["n"]}
+                specs.extend(WarmSpec(generator, kwargs, mode) for mode in modes)
+    return specs
+
+
+@dataclass
+class WarmResult:
+    spec: WarmSpec
+    status: str = "warmed"  # "warmed", "fresh" (already warm), "skipped" (budget or time window) or "failed"
+    error: str = None
+    elapsed: float = 0.0
+    artifacts: list = field(default_factory=list)
+
+
+def get_manifest() -> ResponseCache:
+    """
+    Record of warmed specs. Entries expire REFRESH_MARGIN before the responses they stand for.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ttl = DEFAULT_TTL - REFRESH_MARGIN if DEFAULT_TTL > 2 * REFRESH_MARGIN else DEFAULT_TTL // 2
+    return ResponseCache(os.path.join(CACHE_DIR, "prewarm.sqlite3"), ttl=ttl, max_entries=100_000)
+
+
+def generate_text(spec: WarmSpec) -> str:
+    """
+    Generates a spec the way the app's job does, always fresh, and returns the text the app shows and exports.
+    """
+    if spec.mode == "json":
+        questions = spec.generator(**spec.kwargs, bypass_cache=True, output_format="json")
+        return "\n".join(questions_to_lines(questions))
+    # Streamed like in the app, so the request takes the same model route and cache key
+    return "".join(spec.generator(**spec.kwargs, bypass_cache=True, stream=True))
+
+
+def _warm(spec: WarmSpec, formats, manifest: ResponseCache) -> list:
+    with track_writes() as keys:
+        text = generate_text(spec)
+    events = parse(text)
+    for fmt in formats:
+        stored_export(text, fmt, events)
+    manifest.set(spec.key, json.dumps({"label": spec.label, "content_hash": content_hash(text), "cache_keys": keys},
+                                      ensure_ascii=False))
+    return list(formats)
+
+
+def is_warm(spec: WarmSpec, formats, manifest: ResponseCache) -> bool:
+    """
+    True if the spec was warmed and its cached responses and `formats` artifacts are all still stored.
+    """
+    entry = manifest.get(spec.key)
+    if entry is None:
+        return False
+    entry = json.loads(entry)
+    if not entry.get("cache_keys"):
+        return False  # recorded without its cache keys: nothing to check, warm it again
+    cache, artifacts = get_cache(), get_artifact_store()
+    return (all(cache.contains(key) for key in entry["cache_keys"])
+            and all(artifacts.contains(f"{fmt}:{entry['content_hash']}") for fmt in formats))
+
+
+class Budget:
+    """
+    Limits a run to `max_requests` generations (0 = unlimited) started before `stop_at` (a datetime, or None).
+    """
+
+    def __init__(self, max_requests: int = 0, stop_at: datetime.datetime = None):
+        self.max_requests = max_requests
+        self.stop_at = stop_at
+        self.used = 0
+
+    def take(self) -> bool:
+        if self.max_requests and self.used >= self.max_requests:
+            return False
+        if self.stop_at is not None and datetime.datetime.now() >= self.stop_at:
+            return False
+        self.used += 1
+        return True
+
+
+async def _run_one(spec, semaphore, limiter, budget, formats, manifest, refresh) -> WarmResult:
+    result = WarmResult(spec=spec)
+    if not refresh and await asyncio.to_thread(is_warm, spec, formats, manifest):
+        result.status = "fresh"
+        return result
+    async with semaphore:
+        if not budget.take():
+            result.status = "skipped"
+            return result
+        await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            result.artifacts = await asyncio.to_thread(_warm, spec, formats, manifest)
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def prewarm(specs, formats=("pdf",), max_concurrency: int = 2, requests_per_minute: int = 30,
+                  budget: Budget = None, refresh: bool = False):
+    """
+    Warms specs concurrently within a rate budget.
+
+    Parameters:
+        - specs: WarmSpec objects, e.g. from expand(load_catalog()).
+        - formats: Keys of exporters.EXPORT_FORMATS to pre-render for each warmed set.
+        - max_concurrency: Maximum number of generations in flight at once.
+        - requests_per_minute: Generations started per minute (batch_gen.RateLimiter); 0 disables the limit.
+          A generation the model router escalates makes more than one model request.
+        - budget: Optional Budget capping the number of generations and the time window.
+        - refresh: If True, also regenerate specs that are still warm.
+
+    Yields:
+        - WarmResult objects in completion order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    budget = budget or Budget()
+    manifest = get_manifest()
+    tasks = [asyncio.create_task(_run_one(spec, semaphore, limiter, budget, formats, manifest, refresh))
+             for spec in specs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _stop_time(value: str) -> datetime.datetime:
+    """
+    Next occurrence of a local HH:MM time.
+    """
+    hour, minute = (int(part) for part in value.split(":"))
+    now = datetime.datetime.now()
+    stop = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return stop if stop > now else stop + datetime.timedelta(days=1)
+
+
+async def _main_async(args):
+    languages = tuple(_choices(args.languages)) or LANGUAGES
+    specs = expand(load_catalog(args.catalog), languages, tuple(_choices(args.modes)))
+    budget = Budget(args.max_requests, _stop_time(args.stop_at) if args.stop_at else None)
+    counts = dict.fromkeys(("warmed", "fresh", "skipped", "failed"), 0)
+    start = time.perf_counter()
+    async for result in prewarm(specs, tuple(_choices(args.formats)), args.concurrency, args.rpm, budget,
+                                args.refresh):
+        counts[result.status] += 1
+        if result.status in ("warmed", "failed"):
+            detail = f" in {result.elapsed:.1f}s" if result.status == "warmed" else f": {result.error}"
+            print(f"{result.spec.label}: {result.status}{detail}", file=sys.stderr)
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    print(f"{len(specs)} specs: {summary}, {time.perf_counter() - start:.1f}s total", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate question sets and their exports for catalog roles.")
+    parser.add_argument("catalog", nargs="?", default=CATALOG_PATH,
+                        help="CSV or JSONL role catalog (default: QG_ROLE_CATALOG or role_catalog.csv)")
+    parser.add_argument("--languages", default="|".join(LANGUAGES), help="'|'-separated languages to warm")
+    parser.add_argument("--modes", default="text",
+                        help=f"'|'-separated output modes to warm, among {', '.join(MODES)} (default: text)")
+    parser.add_argument("--formats", default="pdf",
+                        help=f"'|'-separated artifacts to pre-render, among {', '.join(EXPORT_FORMATS)} (default: pdf)")
+    parser.add_argument("--concurrency", type=int, default=2, help="maximum generations in flight")
+    parser.add_argument("--rpm", type=int, default=30, help="maximum generations started per minute (0 = unlimited)")
+    parser.add_argument("--max-requests", type=int, default=0, help="maximum generations in this run (0 = unlimited)")
+    parser.add_argument("--stop-at", help="local HH:MM after which no new generation starts, e.g. 07:00")
+    parser.add_argument("--refresh", action="store_true", help="regenerate sets that are still warm")
+    args = parser.parse_args(argv)
+    for mode in _choices(args.modes):
+        if mode not in MODES:
+            parser.error(f"unknown mode '{mode}'")
+    for fmt in _choices(args.formats):
+        if fmt not in EXPORT_FORMATS:
+            parser.error(f"unknown format '{fmt}'")
+    return asyncio.run(_main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Compaction of long job descriptions before they are pasted into a prompt.
+
+Postings are often thousands of words long, mostly benefits, company blurbs and
+equal-opportunity text. compact_job_description keeps what the questions are
+about: the responsibilities and the required skills. Descriptions that already fit
+in the token budget are left exactly as they are.
+1. Boilerplate sections (benefits, about us, EEO, how to apply...) and sentences are dropped.
+2. Repeated lines are removed.
+3. The remaining lines are sorted into responsibilities, requirements and other text,
+   by section headings or, without headings, by simple keyword hints.
+4. If the result still exceeds the token budget, other text goes first, then the
+   last bullets of the longest list.
+Everything is local and regex based; only the reported token counts may come from the SDK.
+"""
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import gemini_client
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("QG_JD_TOKEN_BUDGET", 1200))  # tokens allowed for the job description
+
+RESPONSIBILITIES, REQUIREMENTS, OTHER, BOILERPLATE = "responsibilities", "requirements", "other", "boilerplate"
+
+_SECTION_KEYWORDS = (
+    (BOILERPLATE, ("benefit", "perk", "we offer", "what we offer", "about us", "about the company", "who we are",
+                   "our company", "equal opportunit", "eeo", "diversity", "inclusion", "privacy", "how to apply",
+                   "application process", "compensation", "salary", "pay range", "why join", "why work",
+                   "beneficios", "ofrecemos", "sobre nosotros", "quiénes somos", "avantages", "nous offrons",
+                   "qui sommes", "à propos")),
+    (RESPONSIBILITIES, ("responsibilit", "what you'll do", "what you will do", "duties", "day to day", "day-to-day",
+                        "your mission", "your role", "the role", "tasks", "funciones", "responsabilidades", "tareas",
+                        "missions", "responsabilités", "vos missions")),
+    (REQUIREMENTS, ("requirement", "qualification", "skill", "must have", "nice to have", "experience", "profile",
+                    "who you are", "what you bring", "what we're looking for", "what we are looking for",
+                    "tech stack", "technolog", "requisitos", "perfil", "competencias", "habilidades", "profil",
+                    "compétences", "exigences")),
+)
+_BOILERPLATE_SENTENCE = re.compile(
+    r"equal (?:employment )?opportunit|without regard to|regardless of (?:race|gender|age|religion)"
+    r"|reasonable accommodation|e-verify|background check|privacy (?:notice|policy)|apply (?:now|today)"
+    r"|click (?:on )?apply|igualdad de oportunidades|égalité des chances",
+    re.IGNORECASE,
+)
+_REQUIREMENT_HINT = re.compile(
+    r"\b(?:experience|knowledge|proficien\w*|familiar\w*|skills?|degree|years?|fluent|understanding|"
+    r"experiencia|conocimientos?|expérience|maîtrise)\b",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^\s*(?:[-*•·▪–]|\d+[.)])\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class Compaction:
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+def _heading(line: str):
+    """
+    Returns the heading text if the line looks like a section heading, else None.
+    """
+    stripped = line.strip()
+    plain = stripped.strip("#*_ ").rstrip(":").strip("*_ ")
+    if not plain or len(plain.split()) > 8 or plain.endswith("."):
+        return None
+    if "," in plain and not (stripped.startswith("#") or stripped.endswith(":")):
+        return None  # "SQL, AWS, ETL" or "**Python, Go**" is a list, not a heading
+    if stripped.startswith("#") or stripped.endswith(":") or stripped.startswith(("**", "__")) or plain.isupper():
+        return plain
+    return None
+
+
+def _section_kind(heading: str) -> str:
+    lowered = heading.lower()
+    for kind, keywords in _SECTION_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return kind
+    return OTHER
+
+
+def extract_sections(job_description: str) -> dict:
+    """
+    Sorts the non-boilerplate, de-duplicated lines of a job description by section kind.
+
+    Returns:
+        - {"responsibilities": [...], "requirements": [...], "other": [...]} of cleaned lines.
+    """
+    sections = {RESPONSIBILITIES: [], REQUIREMENTS: [], OTHER: []}
+    seen = set()
+    kind = OTHER
+    found_headings = False
+    for raw in job_description.splitlines():
+        if not raw.strip():
+            continue
+        heading = _heading(raw)
+        if heading is not None:
+            kind = _section_kind(heading)
+            found_headings = found_headings or kind != OTHER
+            if kind != OTHER:
+                continue
+            raw = heading  # an unrecognized heading may be content ("Backend (Go)"): keep its text
+        if kind == BOILERPLATE or _BOILERPLATE_SENTENCE.search(raw):
+            continue
+        line = _BULLET.sub("", raw).strip()
+        key = " ".join(_WORD.findall(line.lower()))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        target = kind
+        if kind == OTHER and not found_headings and _BULLET.match(raw):
+            # Unstructured posting: bullets are skills if they read like one, duties otherwise
+            target = REQUIREMENTS if _REQUIREMENT_HINT.search(line) else RESPONSIBILITIES
+        sections[target].append(line)
+    return sections
+
+
+def _render(sections: dict) -> str:
+    parts = []
+    if sections[OTHER]:
+        parts.append("\n".join(sections[OTHER]))
+    if sections[RESPONSIBILITIES]:
+        parts.append("Responsibilities:\n" + "\n".join(f"- {line}" for line in sections[RESPONSIBILITIES]))
+    if sections[REQUIREMENTS]:
+        parts.append("Requirements and skills:\n" + "\n".join(f"- {line}" for line in sections[REQUIREMENTS]))
+    return "\n\n".join(parts)
+
+
+def _fit(sections: dict, budget: int) -> dict:
+    """
+    Drops lines, least useful first, until the rendered text fits in `budget` estimated tokens.
+    """
+    sections = {kind: list(lines) for kind, lines in sections.items()}
+    total = gemini_client.estimate_tokens(_render(sections))
+    while total > budget:
+        if sections[OTHER]:
+            kind = OTHER
+        else:
+            kind = max((RESPONSIBILITIES, REQUIREMENTS), key=lambda k: len(sections[k]))
+            if len(sections[kind]) <= 1:
+                break
+        total -= gemini_client.estimate_tokens(sections[kind].pop()) + 1
+    return sections
+
+
+@lru_cache(maxsize=256)
+def compact_job_description(job_description: str, budget: int = DEFAULT_TOKEN_BUDGET,
+                            model_name: str = None) -> Compaction:
+    """
+    Compacts a job description to its responsibilities and skills within `budget` tokens.
+
+    Parameters:
+        - job_description: The posting as pasted by the user.
+        - budget: Maximum tokens for the compacted text (estimated locally while trimming).
+        - model_name: Model whose tokenizer counts the reported tokens (see gemini_client.count_tokens).
+
+    Returns:
+        - A Compaction with the text and the token counts before and after. The text is
+          `job_description` itself when it is within `budget`.
+    """
+    original_tokens = gemini_client.count_tokens(job_description, model_name)
+    if original_tokens <= budget:
+        return Compaction(text=job_description, original_tokens=original_tokens, tokens=original_tokens)
+    sections = extract_sections(job_description)
+    text = _render(_fit(sections, budget))
+    if gemini_client.estimate_tokens(text) > budget:
+        text = text[:budget * gemini_client.CHARS_PER_TOKEN]  # a single huge line
+    if not text.strip():
+        text = job_description[:budget * gemini_client.CHARS_PER_TOKEN]  # nothing recognizable; keep the start
+    return Compaction(
+        text=text,
+        original_tokens=original_tokens,
+        tokens=gemini_client.count_tokens(text, model_name),
+    )
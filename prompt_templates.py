@@ -0,0 +1,139 @@
+"""
+Versioned prompt templates, split into a static system instruction and a variable request.
+
+The system part holds everything that is identical across requests (the interviewer
+role, the quality criteria, the output layout) and is sent as the model's
+system_instruction, so it can be cached server side (see gemini_client context
+caching). The user part only carries what varies: role, level, skills, language,
+job description. Each template is compiled once at import: its literal text and
+field names are split up front, and rendering is a single join.
+
+Bump `version` whenever the text of a template changes. The id ("skills@v2") is
+recorded on every generation's metrics, and response cache keys include the system
+instruction, so cached answers from another template version are never served.
+"""
+import hashlib
+import string
+import textwrap
+
+_formatter = string.Formatter()
+
+
+class PromptTemplate:
+    """
+    Parameters:
+        - name: Template name, e.g. "skills".
+        - version: Integer version, bumped on every change of `system` or `user`.
+        - system: Static instructions, sent as the system instruction.
+        - user: Variable request text with {field} placeholders (no format specs or conversions).
+    """
+
+    def __init__(self, name: str, version: int, system: str, user: str):
+        self.name = name
+        self.version = version
+        self.system = textwrap.dedent(system).strip()
+        self.user = textwrap.dedent(user).strip()
+        self.id = f"{name}@v{version}"
+        self.fingerprint = hashlib.sha256(f"{self.system}\0{self.user}".encode("utf-8")).hexdigest()[:12]
+        self._parts = []
+        for literal, field, spec, conversion in _formatter.parse(self.user):
+            if spec or conversion:
+                raise ValueError(f"Template {self.id}: format specs and conversions are not supported ({field})")
+            self._parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self._parts if field)
+
+    def render(self, **values) -> str:
+        """
+        Fills the user part. Every field must be given; extra values are ignored.
+
+        Raises:
+            - KeyError if a field is missing.
+        """
+        return "".join(literal + (str(values[field]) if field is not None else "") for literal, field in self._parts)
+
+    def __repr__(self):
+        return f"PromptTemplate({self.id}, {self.fingerprint})"
+
+
+SKILLS = PromptTemplate(
+    name="skills",
+    version=2,
+    system="""
+        Each question must be clear, specific, and relevant for a professional interview scenario, allowing for a deep assessment of:
+        * The candidate's ability to take on the position's **responsibilities**.
+        * Mastery of the required **technical skills** and knowledge.
+        * Fit with the **company culture** and the **soft skills** necessary for success.
+
+        **Additional Considerations:**
+        * If the question type is **'technical'** and programming languages are listed in the technical skills (e.g., Python, Java, SQL), include at least one question that requires the candidate to write code using one of those languages.
+        * Any code snippet must be presented within a properly formatted markdown code block (e.g., ```python).
+
+        **For each question, provide the following structured format:**
+
+        1.  **Interview Question:** [Here goes the clear and concise question]
+        2.  **Suggested Ideal Answer:** [A model answer demonstrating relevant understanding and skills]
+        3.  **Code Snippet (if applicable):**
+            ```[language]
+            [relevant code]
+            ```
+        4.  **Evaluation and Justification:** [Brief explanation of what this question evaluates and why the suggested answer is ideal in relation to the role or company culture.]
+    """,
+    user="""
+        Generate {n} high-quality interview questions for the '{rol}' position, designed for a candidate with a '{level}' experience level ({level_description}). The questions and their answers should be generated in **{language}**.
+
+        The questions should be of type '{type}' and focus on evaluating the following critical areas:
+
+        **Key Responsibilities (3-5):**
+        {responsibilities}
+
+        **Essential Technical Skills (3-5):**
+        {technical_skills}
+
+        **Fundamental Soft Skills (3-5):**
+        {soft_skills}
+    """,
+)
+
+JOB_DESCRIPTION = PromptTemplate(
+    name="job_description",
+    version=2,
+    system="""
+        You are an expert in talent selection and technical interviewing.
+
+        Instructions:
+        - Depending on the requested question type, focus on assessing:
+            - **Technical:** Core technical knowledge, problem-solving, and (if applicable and programming languages are mentioned in the job description) include at least one question requiring a code snippet example.
+            - **Behavioral:** Soft skills, decision-making, conflict resolution, leadership, and collaboration.
+        - Ensure a diverse mix of questions covering:
+            - Core responsibilities of the role.
+            - Essential technical skills (frameworks, tools, programming languages).
+            - Crucial soft skills (communication, teamwork, adaptability).
+        - All questions, ideal answers, and explanations must be in the requested language.
+
+        Format each question as a separate entry, clearly labeling the Question, an Ideal Answer (brief but comprehensive), and a concise Explanation of what the question aims to assess. Use a clear, readable text format, like this example:
+
+        Question 1: [Your question here]
+        Ideal Answer: [A concise, exemplary answer]
+        Explanation: [What this question evaluates]
+    """,
+    user="""
+        Generate exactly {n} interview questions for a '{role}' position, targeting a '{level}' candidate with '{previous_experience}' of experience.
+
+        ---
+        Job Description:
+        {job_description}
+        ---
+
+        Question Type: {question_type}
+        Language: {language}
+    """,
+)
+
+TEMPLATES = {template.name: template for template in (SKILLS, JOB_DESCRIPTION)}
+
+
+def versions() -> dict:
+    """
+    Current template ids and fingerprints, e.g. {"skills": "skills@v2:3f1c..."}, for benchmark and cache metadata.
+    """
+    return {name: f"{t.id}:{t.fingerprint}" for name, t in TEMPLATES.items()}
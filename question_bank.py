@@ -0,0 +1,282 @@
+"""
+Local question bank with a NumPy vector index.
+
+Every structured question generated is stored together with the request it answered
+(role, level, skills) and a hashed TF-IDF embedding of that context. A later request
+that is similar enough (e.g. "Data Analyst / SQL, Python" and "Data analyst / Python,
+SQL, Excel") can be served, fully or partly, from previously generated questions.
+
+Vectors are compared with cosine similarity. Small banks are scanned exactly; larger
+ones are first narrowed down with random-hyperplane LSH tables (approximate search).
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from question_models import CodeSnippet, Evaluation, IdealAnswer, Question
+from response_cache import CACHE_DIR
+
+DIMENSIONS = 512
+DEFAULT_THRESHOLD = float(os.getenv("QG_BANK_THRESHOLD", 0.5))
+BRUTE_FORCE_LIMIT = 20000  # below this many vectors an exact scan is faster than LSH
+LSH_TABLES = 10
+LSH_BITS = 10
+REWEIGHT_GROWTH = 1.1
+FETCH_FACTOR = 4  # bodies read per wanted result: room for repeated questions, which are skipped
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by de del des el en et for from in is la las le les los of on or "
+    "the to with y".split()
+)
+
+
+def tokenize(text: str) -> list:
+    # Unigrams only: skill lists come in any order ("SQL, Python" vs "Python, SQL")
+    return [w for w in _TOKEN.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def hashed_tf(text: str) -> np.ndarray:
+    """
+    Sublinear term frequencies hashed into a fixed number of buckets (the hashing trick).
+    """
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    counts = {}
+    for token in tokenize(text):
+        bucket = zlib.crc32(token.encode("utf-8")) % DIMENSIONS
+        counts[bucket] = counts.get(bucket, 0) + 1
+    for bucket, count in counts.items():
+        vector[bucket] = 1.0 + math.log(count)
+    return vector
+
+
+def request_text(role: str, level: str = "", *skills) -> str:
+    """
+    Text describing a generation request, used both when storing and when searching.
+    """
+    return " ".join(part for part in (role, level, *skills) if part)
+
+
+def _question_from_dict(data: dict) -> Question:
+    code = data.get("code")
+    return Question(
+        number=0,
+        text=data["question"],
+        ideal_answer=IdealAnswer(data["ideal_answer"]),
+        evaluation=Evaluation(data["evaluation"]),
+        code=CodeSnippet(code["language"], code["code"]) if code else None,
+    )
+
+
+def _normalized(question_text: str) -> str:
+    return " ".join(_TOKEN.findall(question_text.lower()))
+
+
+class QuestionBank:
+    """
+    SQLite-backed store of generated questions with an in-memory vector index.
+
+    Parameters:
+        - path: SQLite file location (defaults to CACHE_DIR/question_bank.sqlite3).
+    """
+
+    def __init__(self, path: str = None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "question_bank.sqlite3")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id INTEGER PRIMARY KEY,"
+            " context TEXT NOT NULL,"
+            " level TEXT, question_type TEXT, language TEXT,"
+            " body TEXT NOT NULL,"
+            " normalized TEXT NOT NULL,"
+            " buckets BLOB NOT NULL,"  # sparse embedding: non-zero bucket indices (uint16)
+            " weights BLOB NOT NULL,"  # and their term-frequency weights (float32)
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_filter ON questions(language, question_type, level)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS questions_unique ON questions(normalized, language)")
+        self._loaded = False
+
+    # In-memory index -----------------------------------------------------------
+    # Rows live in preallocated arrays that double in size when full, and new rows are
+    # indexed with the current IDF weights. Everything is re-weighted only once the
+    # bank has grown by REWEIGHT_GROWTH since the last full pass.
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT id, level, question_type, language, buckets, weights FROM questions ORDER BY id"
+        ).fetchall()
+        self._ids = [r[0] for r in rows]
+        self._meta = [(r[1], r[2], r[3]) for r in rows]
+        capacity = len(rows) + len(rows) // 4 + 64
+        self._tf = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        self._vectors = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        for i, row in enumerate(rows):
+            self._tf[i, np.frombuffer(row[4], dtype=np.uint16)] = np.frombuffer(row[5], dtype=np.float32)
+        self._df = (self._tf[:len(rows)] > 0).sum(axis=0).astype(np.float32)
+        self._reindex()
+        self._loaded = True
+
+    def _weighted(self, tf: np.ndarray) -> np.ndarray:
+        weighted = tf * self._idf
+        norms = np.linalg.norm(weighted, axis=-1, keepdims=True)
+        return weighted / np.maximum(norms, 1e-12)
+
+    def _lsh_codes(self, vectors: np.ndarray, table: int) -> np.ndarray:
+        return ((vectors @ self._planes[table]) > 0) @ (1 << np.arange(LSH_BITS))
+
+    def _reindex(self):
+        """
+        Recomputes IDF weights, all normalized vectors and, for large banks, the LSH tables.
+        """
+        size = len(self._ids)
+        self._idf = np.log((1.0 + size) / (1.0 + self._df)) + 1.0
+        self._vectors[:size] = self._weighted(self._tf[:size])
+        self._indexed_size = size
+        self._tables = None
+        if size > BRUTE_FORCE_LIMIT:
+            rng = np.random.default_rng(0)
+            self._planes = rng.standard_normal((LSH_TABLES, DIMENSIONS, LSH_BITS)).astype(np.float32)
+            self._tables = []
+            for t in range(LSH_TABLES):
+                table = {}
+                for index, code in enumerate(self._lsh_codes(self._vectors[:size], t).tolist()):
+                    table.setdefault(code, []).append(index)
+                self._tables.append(table)
+
+    def _append(self, row_id: int, tf: np.ndarray, meta: tuple):
+        index = len(self._ids)
+        if index == len(self._tf):
+            self._tf = np.concatenate([self._tf, np.zeros_like(self._tf)])
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._ids.append(row_id)
+        self._meta.append(meta)
+        self._tf[index] = tf
+        self._df += tf > 0
+        self._vectors[index] = self._weighted(tf)
+        if self._tables is not None:
+            for t, table in enumerate(self._tables):
+                table.setdefault(int(self._lsh_codes(self._vectors[index], t)), []).append(index)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        if self._tables is None:
+            return np.arange(len(self._ids))
+        found = set()
+        for t, table in enumerate(self._tables):
+            code = int(self._lsh_codes(query, t))
+            # Probe the query's bucket and every bucket one bit away
+            for probe in [code] + [code ^ (1 << b) for b in range(LSH_BITS)]:
+                found.update(table.get(probe, ()))
+        return np.fromiter(found, dtype=np.int64)
+
+    # Public API ----------------------------------------------------------------
+
+    def add(self, questions, context: str, level: str = None, question_type: str = None, language: str = None) -> int:
+        """
+        Stores generated questions for the request described by `context`.
+        Questions already in the bank (same normalized text and language) are skipped.
+
+        Returns:
+            - The number of questions added.
+        """
+        tf = hashed_tf(context)
+        buckets = np.flatnonzero(tf).astype(np.uint16)
+        added = 0
+        with self._lock:
+            for q in questions:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO questions"
+                    " (context, level, question_type, language, body, normalized, buckets, weights, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (context, level, question_type, language, json.dumps(q.to_dict(), ensure_ascii=False),
+                     _normalized(q.text), buckets.tobytes(), tf[buckets].tobytes(), time.time()),
+                )
+                if cursor.rowcount:
+                    added += 1
+                    if self._loaded:
+                        self._append(cursor.lastrowid, tf, (level, question_type, language))
+            if self._loaded and len(self._ids) > self._indexed_size * REWEIGHT_GROWTH:
+                self._reindex()
+        return added
+
+    def search(self, context: str, k: int, threshold: float = DEFAULT_THRESHOLD, level: str = None,
+               question_type: str = None, language: str = None) -> list:
+        """
+        Returns up to `k` stored questions whose request context is at least `threshold`
+        cosine-similar to `context`, best first. Filters are exact matches when given.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if not self._ids:
+                return []
+            query = hashed_tf(context)
+            if not query.any():
+                return []
+            query = self._weighted(query)
+
+            candidates = self._candidates(query)
+            if len(candidates) == 0:
+                return []
+            wanted = (level, question_type, language)
+            keep = [i for i in candidates.tolist()
+                    if all(w is None or w == m for w, m in zip(wanted, self._meta[i]))]
+            if not keep:
+                return []
+            keep = np.asarray(keep)
+            scores = self._vectors[keep] @ query
+            order = np.argsort(-scores)
+            hits = [(int(keep[o]), float(scores[o])) for o in order if scores[o] >= threshold]
+            ids = [self._ids[i] for i, _ in hits]
+
+        # Questions of one request share its context vector, so many rows can score above the
+        # threshold: read the bodies of the best ones only, a window at a time, until k are found
+        results, seen = [], set()
+        window = max(1, k * FETCH_FACTOR)
+        for start in range(0, len(ids), window):
+            chunk = ids[start:start + window]
+            placeholders = ",".join("?" * len(chunk))
+            rows = {row_id: (body, normalized) for row_id, body, normalized in self._conn.execute(
+                f"SELECT id, body, normalized FROM questions WHERE id IN ({placeholders})", chunk)}
+            for row_id in chunk:
+                body, normalized = rows[row_id]
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+                results.append(_question_from_dict(json.loads(body)))
+                if len(results) == k:
+                    return results
+        return results
+
+    def stats(self) -> dict:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()
+        return {"questions": count}
+
+
+_default_bank = None
+_default_bank_lock = threading.Lock()
+
+
+def get_bank() -> QuestionBank:
+    """
+    Returns the process-wide question bank, creating it on first use.
+    """
+    global _default_bank
+    if _default_bank is None:
+        with _default_bank_lock:
+            if _default_bank is None:
+                _default_bank = QuestionBank()
+    return _default_bank
@@ -1,50 +1,101 @@
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-
-def question_generator_gemini(rol, level, level_description, type, responsibilities, technical_skills, soft_skills, language, n=5):
-    prompt = (
-    f"Generate {n} high-quality interview questions for the '{rol}' position, "
-    f"designed for a candidate with a '{level}' experience level ({level_description}). "
-    f"The questions and their answers should be generated in **{language}**.\n\n"
-    f"The questions should be of type '{type}' and focus on evaluating the following critical areas:\n\n"
-    f"**Key Responsibilities (3-5):**\n"
-    f"{responsibilities}\n\n"
-    f"**Essential Technical Skills (3-5):**\n"
-    f"{technical_skills}\n\n"
-    f"**Fundamental Soft Skills (3-5):**\n"
-    f"{soft_skills}\n\n"
-    f"Each question must be clear, specific, and relevant for a professional interview scenario, "
-    f"allowing for a deep assessment of:\n"
-    f"* The candidate's ability to take on the position's **responsibilities**.\n"
-    f"* Mastery of the required **technical skills** and knowledge.\n"
-    f"* Fit with the **company culture** and the **soft skills** necessary for success.\n\n"
-    f"**Additional Considerations:**\n"
-    f"* If the question type is **'technical'** and programming languages are listed in the technical skills "
-    f"(e.g., Python, Java, SQL), include at least one question that requires the candidate to write code "
-    f"using one of those languages.\n"
-    f"* Any code snippet must be presented within a properly formatted markdown code block "
-    f"(e.g., ```python).\n\n"
-    f"**For each question, provide the following structured format:**\n\n"
-    f"1.  **Interview Question:** [Here goes the clear and concise question]\n"
-    f"2.  **Suggested Ideal Answer:** [A model answer demonstrating relevant understanding and skills]\n"
-    f"3.  **Code Snippet (if applicable):**\n"
-    f"    ```[language]\n"
-    f"    [relevant code]\n"
-    f"    ```\n"
-    f"4.  **Evaluation and Justification:** [Brief explanation of what this question evaluates and why the suggested "
-    f"answer is ideal in relation to the role or company culture.]"
-)
-
-
-    try:
-        # Genera el contenido usando Gemini
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"❌ Error generating questions:\n\n{e}"
+from response_cache import cached_generate, cached_generate_stream
+from instrumentation import annotate, instrumented
+from prompt_templates import SKILLS
+from question_models import questions_to_lines, renumber
+import fanout
+import model_router
+import question_bank
+
+# Choices offered by the skills page (main_app.py), also used by prewarm.py to warm every combination
+LEVELS = ("Entry", "Junior", "Mid", "Senior")
+QUESTION_TYPES = ("Technique", "Behavioral", "Logical", "Mixed")
+LANGUAGES = ("English", "French", "Spanish")
+
+
+def build_prompt(rol, level, level_description, type, responsibilities, technical_skills, soft_skills, language, n=5, focus=None):
+    """
+    Builds the variable part of the skills prompt; the static instructions are
+    prompt_templates.SKILLS.system, sent as the system instruction.
+    """
+    prompt = SKILLS.render(rol=rol, level=level, level_description=level_description, type=type,
+                           responsibilities=responsibilities, technical_skills=technical_skills,
+                           soft_skills=soft_skills, language=language, n=n)
+    if focus:
+        prompt += f"\n\n**Focus of this set:** only ask questions about {focus}."
+    return prompt
+
+
+def focus_areas(type, responsibilities, technical_skills, soft_skills):
+    """
+    Focus areas used by fan-out mode, one per concurrent partial request.
+    """
+    focuses = []
+    if responsibilities:
+        focuses.append(f"the key responsibilities ({responsibilities})")
+    if technical_skills:
+        focuses.append(f"the technical skills ({technical_skills}), without asking the candidate to write code")
+    if soft_skills:
+        focuses.append(f"the soft skills ({soft_skills})")
+    if technical_skills and type.lower() in ("technique", "technical", "mixed"):
+        focuses.append("writing code in one of the programming languages listed in the technical skills")
+    return focuses
+
+
+@instrumented("question_generator_gemini", question_type="type", n="n", language="language",
+              output_format="output_format", model="model_name")
+def question_generator_gemini(rol, level, level_description, type, responsibilities, technical_skills, soft_skills, language, n=5, bypass_cache=False, stream=False, output_format="text", model_name=None, use_bank=False, fan_out=False, regenerate=None, questions=None):
+    def make_prompt(count, focus=None):
+        return build_prompt(rol, level, level_description, type, responsibilities, technical_skills, soft_skills, language, count, focus)
+
+    route = model_router.RouteRequest(question_type=type, n=n, language=language,
+                                      requires_code=model_router.requires_code(type, technical_skills),
+                                      key=f"{output_format}\0{fan_out}\0{make_prompt(n)}")
+
+    def generate_questions():
+        # Structured questions go to the question bank; with use_bank, similar earlier
+        # requests serve part or all of this one and only the missing count is generated.
+        context = question_bank.request_text(rol, level, technical_skills, responsibilities, soft_skills)
+        bank = question_bank.get_bank()
+        reused = []
+        if use_bank and not bypass_cache:
+            reused = bank.search(context, k=n, level=level, question_type=type, language=language)
+        annotate(bank_reused=len(reused))
+        missing = n - len(reused)
+        if missing == 0:
+            return renumber(reused)
+
+        focuses = focus_areas(type, responsibilities, technical_skills, soft_skills) if fan_out else None
+        needed = model_router.RouteRequest(question_type=type, n=missing, language=language,
+                                           requires_code=route.requires_code and not any(q.code for q in reused),
+                                           key=route.key)
+        fresh = model_router.run(needed, lambda model, check: check(fanout.generate_structured(
+            make_prompt, missing, focuses, avoid=reused, model_name=model, bypass_cache=bypass_cache,
+            system_instruction=SKILLS.system)), model_name)
+        bank.add(fresh, context, level=level, question_type=type, language=language)
+        return renumber(reused + fresh)
+
+    annotate(template=SKILLS.id)
+    if regenerate is not None:
+        return model_router.run(model_router.for_regeneration(route), lambda model, check: fanout.regenerate_question(
+            make_prompt, questions, regenerate, model_name=model, bypass_cache=bypass_cache,
+            system_instruction=SKILLS.system, validate=check), model_name)
+
+    if output_format == "json":
+        return generate_questions()
+
+    if fan_out:
+        # Fanned-out questions are merged as structured objects and laid out as text
+        def generate_text():
+            return "\n".join(questions_to_lines(generate_questions()))
+        return fanout.stream_text(generate_text) if stream else generate_text()
+
+    prompt = make_prompt(n)
+
+    if stream:
+        return model_router.run_stream(route, lambda model: cached_generate_stream(
+            prompt, model_name=model, bypass_cache=bypass_cache, system_instruction=SKILLS.system), model_name)
+
+    # Genera el contenido usando Gemini
+    return model_router.run(route, lambda model, check: cached_generate(
+        prompt, model_name=model, bypass_cache=bypass_cache, validate=check, system_instruction=SKILLS.system),
+        model_name)
@@ -1,21 +1,73 @@
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from response_cache import cached_generate, cached_generate_stream
+from instrumentation import annotate, instrumented
+from prompt_compaction import DEFAULT_TOKEN_BUDGET, compact_job_description
+from prompt_templates import JOB_DESCRIPTION
+from gemini_client import estimate_tokens
+from question_models import questions_to_lines, renumber
+import fanout
+import model_router
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+QUESTION_TYPES = ("technical", "behavioral")  # choices of the job-description page (main_app.py)
 
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
 
-def question_generator_for_ui(
+def build_prompt(
     job_description: str,
     role: str,
     level: str,
     previous_experience: str,
     question_type: str = "behavioral",
     language: str = "English",
-    n: int = 5
+    n: int = 5,
+    focus: str = None
 ) -> str:
+    """
+    Builds the variable part of the job-description prompt (see question_generator_for_ui for the
+    parameters); the static instructions are prompt_templates.JOB_DESCRIPTION.system, sent as the
+    system instruction.
+    """
+    prompt = JOB_DESCRIPTION.render(job_description=job_description, role=role, level=level,
+                                    previous_experience=previous_experience,
+                                    question_type=question_type.capitalize(), language=language, n=n)
+    if focus:
+        prompt += f"\n\nFocus of this set: only ask questions about {focus}.\n"
+    return prompt
+
+
+def focus_areas(question_type: str = "behavioral") -> list:
+    """
+    Focus areas used by fan-out mode, one per concurrent partial request.
+    """
+    focuses = [
+        "the core responsibilities described in the job description",
+        "the technical skills, tools and frameworks named in the job description",
+        "the soft skills the role needs (communication, teamwork, adaptability)",
+    ]
+    if question_type.lower() == "technical":
+        focuses.append("a practical exercise that requires a code snippet in a programming language "
+                       "from the job description")
+    return focuses
+
+
+@instrumented("question_generator_for_ui", question_type="question_type", n="n", language="language",
+              output_format="output_format", model="model_name")
+def question_generator_for_ui(
+    job_description: str,
+    role: str,
+    level: str,
+    previous_experience: str,
+    question_type: str = "behavioral",
+    language: str = "English",
+    n: int = 5,
+    bypass_cache: bool = False,
+    stream: bool = False,
+    output_format: str = "text",
+    model_name: str = None,
+    fan_out: bool = False,
+    compact: bool = True,
+    token_budget: int = None,
+    regenerate: str = None,
+    questions: list = None
+):
     """
     Generates structured interview questions based on a job description,
     role, candidate level, desired question type (technical or behavioral),
@@ -29,42 +81,74 @@ def question_generator_for_ui(
         - question_type: 'technical' or 'behavioral'.
         - n: Number of questions to generate.
         - language: The desired language for the questions and answers (e.g., 'English', 'Spanish', 'French').
+        - bypass_cache: If True, skip the response cache and always call the model.
+        - stream: If True, return an iterator of text chunks as they are generated.
+        - output_format: 'text' (default) or 'json'. In JSON mode the model is asked for structured
+          output, which is validated and returned as a list of question_models.Question objects.
+        - model_name: Gemini model to use. By default model_router picks a tier from the request
+          and escalates to a stronger model when the output fails its checks.
+        - fan_out: If True, split the request into concurrent smaller requests, one per focus area
+          (see focus_areas), and merge them without near-duplicates.
+        - compact: If True, a job description over `token_budget` is compacted to its responsibilities
+          and skills (see prompt_compaction) before building the prompt; a shorter one is sent as is.
+        - token_budget: Maximum tokens for the compacted job description (default: QG_JD_TOKEN_BUDGET).
+        - regenerate: Id of one question of `questions` to replace with a new one (see
+          fanout.regenerate_question); the other questions are returned unchanged.
+        - questions: The current list of Question objects, required with `regenerate`.
 
     Returns:
-        - A string containing a list of questions in a structured text format.
+        - A string containing a list of questions in a structured text format,
+          or an iterator over its chunks when `stream` is True.
+        - A list of Question objects when `output_format` is 'json' or `regenerate` is set.
+
+    Raises:
+        - resilience.GenerationError if the model call fails (while iterating, in streaming mode).
+        - question_models.QuestionFormatError (JSON and fan-out modes) if the response does not match the schema.
+        - KeyError if `regenerate` is not the id of one of `questions`.
     """
 
-    prompt = f"""
-You are an expert in talent selection and technical interviewing.
-Generate exactly {n} interview questions for a '{role}' position, targeting a '{level}' candidate with '{previous_experience}' of experience.
-
----
-Job Description:
-{job_description}
----
-
-Question Type: {question_type.capitalize()}
-Language: {language}
-
-Instructions:
-- For '{question_type.capitalize()}' questions, focus on assessing:
-    - **Technical:** Core technical knowledge, problem-solving, and (if applicable and programming languages are mentioned in the job description) include at least one question requiring a code snippet example.
-    - **Behavioral:** Soft skills, decision-making, conflict resolution, leadership, and collaboration.
-- Ensure a diverse mix of questions covering:
-    - Core responsibilities of the role.
-    - Essential technical skills (frameworks, tools, programming languages).
-    - Crucial soft skills (communication, teamwork, adaptability).
-- All questions, ideal answers, and explanations must be in {language}.
-
-Format each question as a separate entry, clearly labeling the Question, an Ideal Answer (brief but comprehensive), and a concise Explanation of what the question aims to assess. Use a clear, readable text format, like this example:
-
-Question 1: [Your question here]
-Ideal Answer: [A concise, exemplary answer]
-Explanation: [What this question evaluates]
-"""
-
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"❌ Error:\n{e}"
+    jd_tokens = None
+    if compact:
+        compaction = compact_job_description(job_description, token_budget or DEFAULT_TOKEN_BUDGET, model_name)
+        job_description = compaction.text
+        jd_tokens = compaction.tokens
+        annotate(jd_tokens=compaction.tokens, tokens_saved=compaction.tokens_saved)
+
+    def make_prompt(count, focus=None):
+        return build_prompt(job_description, role, level, previous_experience, question_type, language, count, focus)
+
+    route = model_router.RouteRequest(question_type=question_type, n=n, language=language,
+                                      requires_code=model_router.requires_code(question_type, job_description),
+                                      jd_tokens=jd_tokens if jd_tokens is not None else estimate_tokens(job_description),
+                                      key=f"{output_format}\0{fan_out}\0{make_prompt(n)}")
+
+    def generate_questions():
+        questions = model_router.run(route, lambda model, check: check(fanout.generate_structured(
+            make_prompt, n, focus_areas(question_type) if fan_out else None, model_name=model,
+            bypass_cache=bypass_cache, system_instruction=JOB_DESCRIPTION.system)), model_name)
+        return renumber(questions)
+
+    annotate(template=JOB_DESCRIPTION.id)
+    if regenerate is not None:
+        return model_router.run(model_router.for_regeneration(route), lambda model, check: fanout.regenerate_question(
+            make_prompt, questions, regenerate, model_name=model, bypass_cache=bypass_cache,
+            system_instruction=JOB_DESCRIPTION.system, validate=check), model_name)
+
+    if output_format == "json":
+        return generate_questions()
+
+    if fan_out:
+        def generate_text():
+            return "\n".join(questions_to_lines(generate_questions()))
+        return fanout.stream_text(generate_text) if stream else generate_text()
+
+    prompt = make_prompt(n)
+
+    if stream:
+        return model_router.run_stream(route, lambda model: cached_generate_stream(
+            prompt, model_name=model, bypass_cache=bypass_cache, system_instruction=JOB_DESCRIPTION.system),
+            model_name)
+
+    return model_router.run(route, lambda model, check: cached_generate(
+        prompt, model_name=model, bypass_cache=bypass_cache, validate=check,
+        system_instruction=JOB_DESCRIPTION.system), model_name)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, replace
+
+# Appended to the request (user part) of the prompt when structured output is requested; the text
+# layout it overrides is the one described in the template's system instruction
+JSON_OUTPUT_INSTRUCTIONS = """
+
+**Output format:** Instead of the text layout given in your instructions, return ONLY a JSON object with this schema:
+{"questions": [{"question": string, "ideal_answer": string, "code": {"language": string, "code": string} or null, "evaluation": string}]}
+Use "code": null when the question needs no code snippet. Do not wrap code in markdown fences inside the JSON.
+"""
+
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def question_id(text: str) -> str:
+    """
+    Stable id of a question: a short hash of its normalized text, so the same question
+    keeps its id across reruns, renumbering and cached responses.
+    """
+    normalized = " ".join(_WORD.findall(text.lower()))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+class QuestionFormatError(ValueError):
+    """
+    Raised when a structured response does not match the question schema.
+    """
+
+
+@dataclass(slots=True)
+class CodeSnippet:
+    language: str
+    code: str
+
+
+@dataclass(slots=True)
+class IdealAnswer:
+    text: str
+
+
+@dataclass(slots=True)
+class Evaluation:
+    text: str
+
+
+@dataclass(slots=True)
+class Question:
+    number: int
+    text: str
+    ideal_answer: IdealAnswer
+    evaluation: Evaluation
+    code: CodeSnippet = None
+    id: str = None
+
+    def __post_init__(self):
+        if not self.id:
+            self.id = question_id(self.text)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "question": self.text,
+            "ideal_answer": self.ideal_answer.text,
+            "code": {"language": self.code.language, "code": self.code.code} if self.code else None,
+            "evaluation": self.evaluation.text,
+        }
+
+
+def _require_text(item: dict, key: str, index: int) -> str:
+    value = item.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise QuestionFormatError(f"Question {index}: '{key}' must be a non-empty string")
+    return value.strip()
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+def parse_questions(text: str, expected: int = None) -> list:
+    """
+    Parses and validates a structured model response.
+
+    Parameters:
+        - text: JSON text, either {"questions": [...]} or a bare list of question objects.
+        - expected: If given, the number of questions the response must contain.
+
+    Returns:
+        - A list of Question objects numbered from 1.
+
+    Raises:
+        - QuestionFormatError if the text is not valid JSON or does not follow the schema.
+    """
+    try:
+        data = json.loads(_strip_fences(text))
+    except json.JSONDecodeError as e:
+        raise QuestionFormatError(f"Response is not valid JSON: {e}") from e
+
+    items = data.get("questions") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise QuestionFormatError("Response does not contain a list of questions")
+    if expected is not None and len(items) != expected:
+        raise QuestionFormatError(f"Expected {expected} questions, got {len(items)}")
+
+    questions = []
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise QuestionFormatError(f"Question {index}: expected an object")
+        code = None
+        raw_code = item.get("code")
+        if isinstance(raw_code, dict) and str(raw_code.get("code") or "").strip():
+            code = CodeSnippet(
+                language=str(raw_code.get("language") or "text").strip().lower(),
+                code=str(raw_code["code"]).strip("\n"),
+            )
+        questions.append(Question(
+            number=index,
+            text=_require_text(item, "question", index),
+            ideal_answer=IdealAnswer(_require_text(item, "ideal_answer", index)),
+            evaluation=Evaluation(_require_text(item, "evaluation", index)),
+            code=code,
+            id=item.get("id") if isinstance(item.get("id"), str) else None,
+        ))
+    return questions
+
+
+def renumber(questions) -> list:
+    """
+    Returns copies of the questions numbered 1..n in list order.
+    """
+    return [replace(q, number=i) for i, q in enumerate(questions, start=1)]
+
+
+def replace_question(questions, question_id: str, new) -> list:
+    """
+    Returns `questions` with the question `question_id` replaced by `new`, which takes its number.
+
+    Raises:
+        - KeyError if no question has that id.
+    """
+    for position, q in enumerate(questions):
+        if q.id == question_id:
+            return questions[:position] + [replace(new, number=q.number)] + questions[position + 1:]
+    raise KeyError(question_id)
+
+
+def questions_to_lines(questions) -> list:
+    """
+    Lays out Question objects in the same line-based format as text mode,
+    with code snippets inside ``` fences.
+    """
+    lines = []
+    for q in questions:
+        lines.append(f"**Question {q.number}:** {q.text}")
+        lines.append(f"**Ideal Answer:** {q.ideal_answer.text}")
+        if q.code:
+            lines.append(f"```{q.code.language}")
+            lines.extend(q.code.code.split("\n"))
+            lines.append("```")
+        lines.append(f"**Evaluation:** {q.evaluation.text}")
+        lines.append("")
+    return lines
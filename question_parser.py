@@ -0,0 +1,159 @@
+"""
+Single-pass parser turning generated question text into a flat list of events.
+
+The text is scanned once, line by line, as it arrives (IncrementalParser.feed works
+on streamed chunks just as well as on a whole response), and every consumer works
+from the resulting events: the Streamlit pages, the PDF/TXT/Markdown/DOCX exporters
+and the bulk exporter. Event kinds:
+- heading: a markdown "#" line (text without the hashes, level = number of hashes)
+- text: any other non-blank line outside code fences, stripped
+- code: a whole ``` fenced block, with the fence's language tag (None if absent)
+- question: a boundary emitted just before the line that starts a new question
+"""
+import re
+from typing import NamedTuple
+
+HEADING, TEXT, CODE, QUESTION = "heading", "text", "code", "question"
+
+# "**Question 3:**", "### Question 3", "1. **Interview Question:**", "Pregunta 2:"...
+_QUESTION_START = re.compile(
+    r"^[#*_\s]*(?:\d+[.)]\s*)?[*_\s]*(?:interview\s+)?(?:question|pregunta)"
+    r"(?:\s+(?:d'entretien|de\s+entrevista))?\s*(\d+)?\s*(?:[*_:.)]|$)",
+    re.IGNORECASE,
+)
+
+
+def _is_label(stripped: str) -> bool:
+    """
+    True if a question-start line has no text after its label, e.g. "**Question 1**" or "Pregunta 2:".
+    """
+    return not _QUESTION_START.sub("", stripped, count=1).strip(" *_:.)#")
+
+
+class Event(NamedTuple):
+    kind: str
+    text: str = ""
+    language: str = None  # code events only
+    level: int = 0  # heading events only
+
+
+class IncrementalParser:
+    """
+    Consumes generated text chunk by chunk and appends complete events to `events`.
+
+    A line becomes an event once its newline arrives, and a code block once its
+    closing fence arrives; close() flushes whatever is left at the end of the text.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._partial = []  # chunks of the line still being received
+        self._code = None  # lines of the open code block, None outside code
+        self._language = None
+        self._question_open = False  # a boundary was emitted and no text or code followed yet
+
+    def feed(self, chunk: str) -> list:
+        """
+        Parses the complete lines in `chunk` (plus any line started by earlier chunks).
+
+        Returns:
+            - The events added by this chunk.
+        """
+        start = len(self.events)
+        if "\n" not in chunk:
+            if chunk:
+                self._partial.append(chunk)
+            return []
+        lines = chunk.split("\n")
+        lines[0] = "".join(self._partial) + lines[0]
+        tail = lines.pop()
+        self._partial = [tail] if tail else []
+        for line in lines:
+            self._line(line)
+        return self.events[start:]
+
+    def close(self) -> list:
+        """
+        Ends the text: parses the last unterminated line and closes an unterminated code block.
+
+        Returns:
+            - The events added by closing.
+        """
+        start = len(self.events)
+        if self._partial:
+            self._line("".join(self._partial))
+            self._partial = []
+        if self._code:
+            self.events.append(Event(CODE, "\n".join(self._code), self._language))
+        self._code = None
+        return self.events[start:]
+
+    def pending(self) -> list:
+        """
+        Events for the unfinished tail (an open code block or a partial line), for live display only.
+        """
+        tail = "".join(self._partial)
+        if self._code is not None:
+            lines = self._code + [tail] if tail else self._code
+            return [Event(CODE, "\n".join(lines), self._language)] if lines else []
+        return self._text_events(tail.strip()) if tail.strip() else []
+
+    def _line(self, line: str):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if self._code is None:
+                self._code = []
+                self._language = stripped[3:].strip() or None
+            else:
+                self.events.append(Event(CODE, "\n".join(self._code), self._language))
+                self._code = None
+                self._question_open = False
+            return
+        if self._code is not None:
+            self._code.append(line)
+        elif stripped:
+            events = self._text_events(stripped)
+            if events[0].kind == QUESTION:
+                # A heading or a bare label ("**Question 1:**") leaves the boundary open for the
+                # question itself on the next line ("1. **Interview Question:** ...")
+                self._question_open = events[-1].kind != TEXT or _is_label(stripped)
+            elif events[-1].kind == TEXT:
+                self._question_open = False
+            self.events.extend(events)
+
+    def _text_events(self, stripped: str) -> list:
+        events = []
+        # "### Question 1" followed by "**Interview Question:** ..." is still one question
+        if not self._question_open:
+            match = _QUESTION_START.match(stripped)
+            if match:
+                events.append(Event(QUESTION, match.group(1) or ""))
+        if stripped.startswith("#"):
+            text = stripped.lstrip("#")
+            events.append(Event(HEADING, text.strip(), level=len(stripped) - len(text)))
+        else:
+            events.append(Event(TEXT, stripped))
+        return events
+
+
+def parse(text: str) -> list:
+    """
+    Parses a whole generated text into events.
+    """
+    parser = IncrementalParser()
+    parser.feed(text)
+    parser.close()
+    return parser.events
+
+
+def split_questions(events) -> list:
+    """
+    Splits events at question boundaries. Events before the first boundary (e.g. an
+    introduction) form a leading segment of their own, if there are any.
+    """
+    segments = [[]]
+    for event in events:
+        if event.kind == QUESTION and segments[-1]:
+            segments.append([])
+        segments[-1].append(event)
+    return segments if segments[0] else []
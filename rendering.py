@@ -0,0 +1,20 @@
+"""
+Streamlit rendering shared by the app entry points (main_app.py, app.py, app2.py).
+"""
+import streamlit as st
+
+from highlighting import code_language
+from question_parser import CODE, HEADING, TEXT
+
+
+def render_events(events):
+    """
+    Renders parsed generated text (see question_parser), finished or still streaming.
+    """
+    for event in events:
+        if event.kind == CODE:
+            st.code(event.text, language=code_language(event.language))
+        elif event.kind == HEADING:
+            st.markdown(f"{'#' * event.level} {event.text}")
+        elif event.kind == TEXT:
+            st.markdown(event.text)
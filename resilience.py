@@ -0,0 +1,239 @@
+"""
+Resilient call layer for model requests: error classification, retries with
+exponential backoff and jitter, per-call deadlines, hedged requests and a
+circuit breaker for exhausted quota.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+DEFAULT_DEADLINE = float(os.getenv("QG_DEADLINE", 90))  # seconds for a whole call, retries included
+MAX_ATTEMPTS = int(os.getenv("QG_MAX_ATTEMPTS", 4))
+BASE_DELAY = 0.5
+MAX_DELAY = 8.0
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # latency samples needed before hedging kicks in
+HEDGE_ENABLED = os.getenv("QG_HEDGE", "1") != "0"
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class GenerationError(Exception):
+    """
+    Base class for classified generation failures shown to users.
+    """
+    retryable = False
+
+
+class RetryableError(GenerationError):
+    """
+    Transient failure (rate limit, 5xx, network); retried with backoff.
+    """
+    retryable = True
+
+
+class RateLimitedError(RetryableError):
+    """
+    HTTP 429. Retried, and counted by the quota circuit breaker.
+    """
+
+
+class FatalError(GenerationError):
+    """
+    Failure that a retry cannot fix (bad request, auth, blocked prompt).
+    """
+
+
+class DeadlineExceededError(GenerationError):
+    """
+    The call did not succeed before its deadline.
+    """
+
+
+class QuotaExhaustedError(GenerationError):
+    """
+    The circuit breaker is open because the quota keeps being exhausted.
+    """
+
+
+def classify(exc: Exception) -> GenerationError:
+    """
+    Maps an SDK or transport exception to a GenerationError subclass.
+    """
+    if isinstance(exc, GenerationError):
+        return exc
+    status = getattr(exc, "code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return RateLimitedError(f"Rate limit or quota exceeded: {exc}")
+        if status in RETRYABLE_STATUS:
+            return RetryableError(f"Service temporarily unavailable ({status}): {exc}")
+        return FatalError(f"Request rejected ({status}): {exc}")
+    if isinstance(exc, (OSError, TimeoutError)):  # connection resets, socket timeouts
+        return RetryableError(f"Network error: {exc}")
+    return FatalError(f"{type(exc).__name__}: {exc}")
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive rate-limit failures and rejects calls
+    for `cooldown` seconds, instead of hammering an exhausted quota.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise QuotaExhaustedError(f"API quota exhausted; retry in {remaining:.0f}s")
+            self._opened_at = None  # half-open: let the next call probe
+
+    def record(self, error: GenerationError = None):
+        with self._lock:
+            if isinstance(error, RateLimitedError):
+                self._failures += 1
+                if self._failures >= self.threshold:
+                    self._opened_at = time.monotonic()
+            elif error is None:
+                self._failures = 0
+
+
+class LatencyTracker:
+    """
+    Keeps recent successful call latencies of one model to derive its hedging threshold.
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+breaker = CircuitBreaker()
+_latencies = {}  # latency key (model name) -> LatencyTracker
+_latencies_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="qg-hedge")  # hedges only, never primaries
+
+
+def latency_tracker(key: str) -> LatencyTracker:
+    """
+    Returns the tracker of complete (non-streamed) call latencies for `key`, e.g. a model
+    name: models differ too much in speed to share one hedging threshold.
+    """
+    tracker = _latencies.get(key)
+    if tracker is None:
+        with _latencies_lock:
+            tracker = _latencies.setdefault(key, LatencyTracker())
+    return tracker
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter for the given 0-based retry attempt.
+    """
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+
+def _run_primary(fn, timeout: float, future: Future):
+    if future.set_running_or_notify_cancel():
+        try:
+            future.set_result(fn(timeout))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+def _attempt(fn, timeout: float, latencies: LatencyTracker):
+    """
+    Runs one attempt. If hedging is on and the attempt is slower than the recent
+    p95 latency, a second identical request is sent and the first success wins.
+
+    Without hedging the attempt runs in the caller's thread. With hedging, the primary
+    request starts at once on a thread of its own (never queued behind other calls, so
+    the hedge delay is measured from when it really starts) and only the hedge goes
+    through the bounded hedge pool.
+    """
+    hedge_after = latencies.percentile(HEDGE_PERCENTILE) if latencies is not None and HEDGE_ENABLED else None
+    if hedge_after is None or hedge_after >= timeout:
+        return fn(timeout)
+
+    primary = Future()
+    threading.Thread(target=contextvars.copy_context().run, args=(_run_primary, fn, timeout, primary),
+                     name="qg-primary", daemon=True).start()
+    futures = [primary]
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done:
+        futures.append(_hedge_pool.submit(fn, timeout - hedge_after))
+    error = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call(fn, deadline: float = None, max_attempts: int = MAX_ATTEMPTS, hedge: bool = True, latency_key: str = None):
+    """
+    Calls `fn(timeout)` with retries, a deadline and optional hedging.
+
+    Parameters:
+        - fn: Callable taking the per-attempt timeout in seconds.
+        - deadline: Seconds allowed for the whole call, retries included (default: DEFAULT_DEADLINE).
+        - max_attempts: Maximum number of attempts for retryable errors.
+        - hedge: Allow a hedged second request when an attempt exceeds the p95 latency. Only
+          hedged calls are timed: pass False for calls whose duration is not the full request
+          (e.g. a stream, which returns at its first chunk).
+        - latency_key: Latency population the call belongs to, e.g. the model name.
+
+    Raises:
+        - GenerationError subclasses: FatalError, RetryableError (after the last attempt),
+          DeadlineExceededError or QuotaExhaustedError.
+    """
+    deadline_at = time.monotonic() + (deadline or DEFAULT_DEADLINE)
+    latencies = latency_tracker(latency_key) if hedge else None
+    for attempt in range(max_attempts):
+        breaker.check()
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError("Generation did not finish before its deadline")
+        start = time.monotonic()
+        try:
+            result = _attempt(fn, remaining, latencies)
+        except Exception as e:
+            error = classify(e)
+            breaker.record(error)
+            if not error.retryable or attempt == max_attempts - 1:
+                raise error from e
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline_at:
+                raise DeadlineExceededError(f"Generation did not finish before its deadline: {error}") from e
+            time.sleep(delay)
+            continue
+        breaker.record()
+        if latencies is not None:
+            latencies.add(time.monotonic() - start)
+        return result
@@ -0,0 +1,240 @@
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import gemini_client
+import instrumentation
+from resilience import classify
+
+CACHE_DIR = os.getenv("QG_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+DEFAULT_TTL = int(os.getenv("QG_CACHE_TTL", 7 * 24 * 3600))  # seconds
+DEFAULT_MAX_ENTRIES = int(os.getenv("QG_CACHE_MAX_ENTRIES", 2000))
+
+_written_keys = contextvars.ContextVar("qg_written_cache_keys", default=None)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Collapses whitespace so that prompts differing only in spacing or
+    indentation share the same cache entry.
+    """
+    lines = (" ".join(line.split()) for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(prompt: str, model_name: str, generation_config: dict = None, system_instruction: str = None) -> str:
+    """
+    Content address of a generation: SHA-256 of the model name, the generation
+    config (if any), the system instruction (if any, i.e. the prompt template version)
+    and the normalized prompt.
+    """
+    config = json.dumps(generation_config, sort_keys=True) if generation_config else ""
+    payload = f"{model_name}\0{config}\0{normalize_prompt(prompt)}"
+    if system_instruction:
+        payload += f"\0{normalize_prompt(system_instruction)}"
+    payload = payload.encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent SQLite store for model responses with TTL expiry and
+    size-bounded LRU eviction.
+
+    Parameters:
+        - path: SQLite file location (defaults to CACHE_DIR/responses.sqlite3).
+        - ttl: Seconds an entry stays valid. 0 or less disables expiry.
+        - max_entries: Maximum number of rows kept; least recently used rows are evicted first.
+    """
+
+    def __init__(self, path: str = None, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "responses.sqlite3")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+
+    def get(self, key: str):
+        """
+        Returns the cached value for `key`, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl > 0 and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def contains(self, key: str) -> bool:
+        """
+        True if `key` has a live entry. Unlike get, this is not counted as a hit or miss
+        and does not make the entry recently used.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.ttl <= 0 or time.time() - row[0] <= self.ttl)
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        if self.ttl > 0:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """
+    Returns the process-wide cache, creating it on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+    return _default_cache
+
+
+@contextmanager
+def track_writes():
+    """
+    Collects the keys of the responses cached by cached_generate and cached_generate_stream
+    within the block, including calls made from threads started with a copy of its context.
+
+    Yields:
+        - The list the keys are appended to.
+    """
+    keys = []
+    token = _written_keys.set(keys)
+    try:
+        yield keys
+    finally:
+        _written_keys.reset(token)
+
+
+def _store(cache: ResponseCache, key: str, text: str):
+    cache.set(key, text)
+    keys = _written_keys.get()
+    if keys is not None:
+        keys.append(key)
+
+
+def cached_generate(prompt: str, model_name: str = None, bypass_cache: bool = False,
+                    generation_config: dict = None, validate=None, system_instruction: str = None) -> str:
+    """
+    Returns the model's response text for `prompt`, serving repeated prompts from the cache.
+
+    Parameters:
+        - prompt: The full prompt text.
+        - model_name: Model to call (default: gemini_client.DEFAULT_MODEL); part of the cache key.
+        - bypass_cache: If True, always call the model; the fresh response still replaces the cached one.
+        - generation_config: Optional generation config, passed to the model and part of the cache key.
+        - validate: Optional callable run on a fresh response before it is cached; it should raise on bad output.
+        - system_instruction: Optional static instructions sent as the model's system instruction; part of the cache key.
+    """
+    model_name = model_name or gemini_client.DEFAULT_MODEL
+    cache = get_cache()
+    key = cache_key(prompt, model_name, generation_config, system_instruction)
+    if not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            instrumentation.annotate(cache="hit")
+            return cached
+    instrumentation.annotate(cache="bypass" if bypass_cache else "miss")
+
+    # Exceptions propagate so that failures are never cached
+    text = gemini_client.generate_text(prompt, model_name=model_name, generation_config=generation_config,
+                                       system_instruction=system_instruction)
+    if validate is not None:
+        validate(text)
+    _store(cache, key, text)
+    return text
+
+
+def cached_generate_stream(prompt: str, model_name: str = None, bypass_cache: bool = False,
+                           system_instruction: str = None):
+    """
+    Streaming counterpart of cached_generate: yields text chunks as the model produces them.
+
+    A cache hit is yielded as a single chunk. A fresh response is stored only once the
+    stream has been fully consumed, so interrupted streams never leave partial entries.
+    """
+    model_name = model_name or gemini_client.DEFAULT_MODEL
+    cache = get_cache()
+    key = cache_key(prompt, model_name, system_instruction=system_instruction)
+    if not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            instrumentation.annotate(cache="hit")
+            yield cached
+            return
+    instrumentation.annotate(cache="bypass" if bypass_cache else "miss")
+
+    parts = []
+    chunk = None
+    try:
+        for chunk in gemini_client.generate(prompt, model_name=model_name, stream=True,
+                                            system_instruction=system_instruction):
+            text = chunk.text
+            parts.append(text)
+            yield text
+    except Exception as e:
+        raise classify(e) from e
+    instrumentation.note_usage(chunk)  # the last chunk carries the totals
+    _store(cache, key, "".join(parts))
@@ -0,0 +1,257 @@
+"""
+Headless REST service exposing the question generators, for programmatic callers (e.g. an ATS).
+
+    uvicorn service:app --port 8000
+    QG_BACKEND=fake uvicorn service:app   # offline, against the fake model backend
+
+Identical concurrent requests share one upstream call (single flight), each client
+(X-Client-Id header, or the caller's address) has a concurrency limit, generations
+can be streamed as plain text, and PDF/TXT/... artifacts are rendered on request.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
+
+import gemini_client
+from exporters import EXPORT_FORMATS, export
+from question_gen import question_generator_gemini
+from question_gen2 import question_generator_for_ui
+from question_models import QuestionFormatError, parse_questions, questions_to_lines
+from resilience import DeadlineExceededError, FatalError, GenerationError, QuotaExhaustedError, RateLimitedError
+
+MAX_CONCURRENCY_PER_CLIENT = int(os.getenv("QG_SERVICE_CLIENT_CONCURRENCY", 4))
+MAX_QUESTIONS = 20
+
+
+class SkillsRequest(BaseModel):
+    rol: str
+    level: str
+    level_description: str = ""
+    type: str = "Technique"
+    responsibilities: str = ""
+    technical_skills: str = ""
+    soft_skills: str = ""
+    language: str = "English"
+    n: int = Field(5, ge=1, le=MAX_QUESTIONS)
+    bypass_cache: bool = False
+    use_bank: bool = False
+    fan_out: bool = False
+    model_name: Optional[str] = None
+
+
+class JobDescriptionRequest(BaseModel):
+    job_description: str
+    role: str
+    level: str
+    previous_experience: str = ""
+    question_type: str = "behavioral"
+    language: str = "English"
+    n: int = Field(5, ge=1, le=MAX_QUESTIONS)
+    bypass_cache: bool = False
+    fan_out: bool = False
+    token_budget: Optional[int] = Field(None, ge=50)
+    model_name: Optional[str] = None
+
+
+class SkillsRegenerateRequest(SkillsRequest):
+    questions: list[dict] = Field(..., min_length=1, max_length=MAX_QUESTIONS)
+
+
+class JobDescriptionRegenerateRequest(JobDescriptionRequest):
+    questions: list[dict] = Field(..., min_length=1, max_length=MAX_QUESTIONS)
+
+
+class ExportRequest(BaseModel):
+    text: str
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same key await its result.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn):
+        """
+        Runs `fn()` in a worker thread, or joins the call already running for `key`.
+        """
+        future = self._flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(fn))
+            self._flights[key] = future
+            future.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the call the others are waiting for
+        return await asyncio.shield(future)
+
+
+class ClientLimiter:
+    """
+    Caps the number of in-flight requests per client; extra requests are rejected with 429.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENCY_PER_CLIENT):
+        self.max_concurrent = max_concurrent
+        self._active = {}
+
+    def acquire(self, client: str):
+        if self._active.get(client, 0) >= self.max_concurrent:
+            raise HTTPException(status_code=429, detail=f"At most {self.max_concurrent} concurrent requests per client",
+                                headers={"Retry-After": "1"})
+        self._active[client] = self._active.get(client, 0) + 1
+
+    def release(self, client: str):
+        self._active[client] -= 1
+        if not self._active[client]:
+            del self._active[client]
+
+
+def _client_id(request: Request) -> str:
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+
+def _flight_key(endpoint: str, body: BaseModel) -> str:
+    payload = json.dumps([endpoint, body.model_dump()], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _http_error(e: Exception) -> HTTPException:
+    if isinstance(e, (RateLimitedError, QuotaExhaustedError)):
+        return HTTPException(status_code=429, detail=str(e))
+    if isinstance(e, DeadlineExceededError):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, (FatalError, QuestionFormatError)):
+        return HTTPException(status_code=502, detail=str(e))
+    return HTTPException(status_code=503, detail=str(e))
+
+
+async def _generate(request: Request, endpoint: str, body: BaseModel, generator, **overrides) -> dict:
+    client = _client_id(request)
+    limiter.acquire(client)
+    kwargs = {**body.model_dump(), **overrides, "output_format": "json"}
+    try:
+        questions = await flights.do(_flight_key(endpoint, body), lambda: generator(**kwargs))
+    except (GenerationError, QuestionFormatError) as e:
+        raise _http_error(e) from e
+    finally:
+        limiter.release(client)
+    return {
+        "questions": [{"number": q.number, **q.to_dict()} for q in questions],
+        "text": "\n".join(questions_to_lines(questions)),
+    }
+
+
+async def _regenerate(request: Request, endpoint: str, body: BaseModel, generator, question_id: str) -> dict:
+    try:
+        current = parse_questions(json.dumps(body.questions))
+    except QuestionFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    if not any(q.id == question_id for q in current):
+        raise HTTPException(status_code=404, detail=f"No question with id '{question_id}'")
+    # Only one question is generated; n=1 keeps the per-question metrics right
+    return await _generate(request, f"{endpoint}/regenerate/{question_id}", body, generator,
+                           n=1, regenerate=question_id, questions=current)
+
+
+async def _stream(request: Request, body: BaseModel, generator) -> StreamingResponse:
+    client = _client_id(request)
+    limiter.acquire(client)
+    chunks = iterate_in_threadpool(generator(**body.model_dump(), stream=True))
+    # Wait for the first chunk, so that failures of the request itself still get a proper status
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except Exception as e:
+        limiter.release(client)
+        if isinstance(e, (GenerationError, QuestionFormatError)):
+            raise _http_error(e) from e
+        raise
+
+    async def body_iterator():
+        # The client slot is held until the stream ends or the caller disconnects
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        except GenerationError as e:
+            yield f"\n\n[error] {e}\n"  # headers are already sent; report in-band
+        finally:
+            limiter.release(client)
+
+    return StreamingResponse(body_iterator(), media_type="text/plain; charset=utf-8")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if not gemini_client.configure():
+        raise RuntimeError("The GEMINI_API_KEY environment variable is not configured.")
+    yield
+
+
+app = FastAPI(title="Interview Question Generator", lifespan=lifespan)
+flights = SingleFlight()
+limiter = ClientLimiter()
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "coalesced_requests": flights.coalesced}
+
+
+@app.post("/v1/questions/skills")
+async def skills_questions(body: SkillsRequest, request: Request):
+    return await _generate(request, "skills", body, question_generator_gemini)
+
+
+@app.post("/v1/questions/job-description")
+async def job_description_questions(body: JobDescriptionRequest, request: Request):
+    return await _generate(request, "job-description", body, question_generator_for_ui)
+
+
+@app.post("/v1/questions/skills/stream")
+async def skills_questions_stream(body: SkillsRequest, request: Request):
+    return await _stream(request, body, question_generator_gemini)
+
+
+@app.post("/v1/questions/job-description/stream")
+async def job_description_questions_stream(body: JobDescriptionRequest, request: Request):
+    return await _stream(request, body, question_generator_for_ui)
+
+
+@app.post("/v1/questions/skills/regenerate/{question_id}")
+async def skills_regenerate(question_id: str, body: SkillsRegenerateRequest, request: Request):
+    """
+    Replaces one question (by id) of a previous response's "questions", keeping the others.
+    """
+    return await _regenerate(request, "skills", body, question_generator_gemini, question_id)
+
+
+@app.post("/v1/questions/job-description/regenerate/{question_id}")
+async def job_description_regenerate(question_id: str, body: JobDescriptionRegenerateRequest, request: Request):
+    return await _regenerate(request, "job-description", body, question_generator_for_ui, question_id)
+
+
+@app.post("/v1/artifacts/{fmt}")
+async def artifact(fmt: str, body: ExportRequest):
+    """
+    Renders question text (e.g. the "text" field of a generation response) as pdf, txt, md or docx.
+    """
+    spec = EXPORT_FORMATS.get(fmt)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown format '{fmt}'; available: {', '.join(EXPORT_FORMATS)}")
+    data = await asyncio.to_thread(export, body.text, fmt)
+    return Response(content=data, media_type=spec.mime,
+                    headers={"Content-Disposition": f'attachment; filename="interview_questions.{spec.extension}"'})
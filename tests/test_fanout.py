@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fanout
+from question_models import Evaluation, IdealAnswer, Question, QuestionFormatError
+
+
+def _question(number, text):
+    return Question(number, text, IdealAnswer("answer"), Evaluation("evaluation"))
+
+
+def test_regenerate_question_rejects_a_set_with_repeated_ids(monkeypatch):
+    questions = [_question(1, "How do you design a REST API?"), _question(2, "Explain SQL window functions.")]
+    calls = []
+
+    def always_repeats(prompt, count, model_name, bypass_cache, system_instruction=None):
+        calls.append(bypass_cache)
+        return [_question(1, "Explain SQL window functions.")]
+
+    monkeypatch.setattr(fanout, "_generate", always_repeats)
+    with pytest.raises(QuestionFormatError):
+        fanout.regenerate_question(lambda count, focus: "prompt", questions, questions[0].id)
+    assert len(calls) == fanout.TOP_UP_ROUNDS + 1
+    assert calls[1:] == [True] * fanout.TOP_UP_ROUNDS  # retries skip the cached duplicate
+
+
+def test_regenerate_question_replaces_only_the_requested_question(monkeypatch):
+    questions = [_question(1, "How do you design a REST API?"), _question(2, "Explain SQL window functions.")]
+    monkeypatch.setattr(fanout, "_generate", lambda *args, **kwargs: [_question(1, "How do you test a data pipeline?")])
+    result = fanout.regenerate_question(lambda count, focus: "prompt", questions, questions[0].id)
+    assert [q.text for q in result] == ["How do you test a data pipeline?", "Explain SQL window functions."]
+    assert len({q.id for q in result}) == len(result)
@@ -0,0 +1,25 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+
+
+def _value(text, metric):
+    return float(re.search(rf"^{re.escape(metric)} (\S+)$", text, re.MULTILINE).group(1))
+
+
+def test_prometheus_counters_keep_increasing_after_buffer_eviction(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_records", instrumentation.deque(maxlen=3))
+    instrumentation.clear()
+    for _ in range(5):
+        instrumentation.store_record("op", 0.5, prompt_tokens=10)
+    instrumentation.store_record("op", 0.5, error="TimeoutError")
+    text = instrumentation.export_prometheus()
+    assert len(instrumentation.records()) == 3
+    assert _value(text, 'qg_operation_seconds_count{operation="op"}') == 6
+    assert _value(text, 'qg_operation_seconds_sum{operation="op"}') == 3.0
+    assert _value(text, 'qg_tokens_total{operation="op",kind="prompt"}') == 50
+    assert _value(text, 'qg_errors_total{operation="op",error="TimeoutError"}') == 1
@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import DONE, FAILED, Job, JobQueue
+
+
+def _wait(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_finished_jobs_have_a_finish_time():
+    queue = JobQueue(max_workers=1)
+    done = _wait(queue, queue.submit("owner", lambda: "text"))
+    failed = _wait(queue, queue.submit("owner", lambda: 1 / 0))
+    assert (done.status, failed.status) == (DONE, FAILED)
+    assert done.finished_at is not None and failed.finished_at is not None
+
+
+def test_purge_skips_a_job_still_being_finished():
+    queue = JobQueue(max_workers=1)
+    job = Job(id="finishing", owner="other", fn=None, kwargs={}, status=DONE)  # no finished_at yet
+    queue._jobs[job.id] = job
+    queue.submit("owner", lambda: "text")  # purges before queueing
+    assert queue.get("finishing") is job
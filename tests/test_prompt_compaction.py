@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_compaction import REQUIREMENTS, RESPONSIBILITIES, compact_job_description, extract_sections
+
+
+def test_job_description_within_budget_is_unchanged():
+    text = "Backend developer\nSQL, AWS, ETL\nBuild REST APIs in Go"
+    compaction = compact_job_description(text, budget=1200)
+    assert compaction.text == text
+    assert compaction.tokens_saved == 0
+
+
+def test_comma_separated_list_is_not_a_heading():
+    sections = extract_sections("Backend developer\nSQL, AWS, ETL\nBuild REST APIs in Go")
+    assert "SQL, AWS, ETL" in sum(sections.values(), [])
+
+
+def test_unrecognized_heading_text_is_kept():
+    sections = extract_sections("## Backend (Go)\nBuild REST APIs\n## Requirements\n- 3 years of SQL experience")
+    assert "Backend (Go)" in sections["other"]
+    assert sections[REQUIREMENTS] == ["3 years of SQL experience"]
+    assert sections[RESPONSIBILITIES] == []
+
+
+def test_long_job_description_is_compacted_to_budget():
+    text = "\n".join(["## Responsibilities"] + [f"- Build data pipeline number {i} in Python" for i in range(300)]
+                     + ["## Benefits", "- Free lunch"])
+    compaction = compact_job_description(text, budget=200)
+    assert "Free lunch" not in compaction.text
+    assert compaction.tokens < compaction.original_tokens
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_router
+from question_parser import QUESTION, parse, split_questions
+
+# Layouts the prompt templates produce (prompt_templates.SKILLS and JOB_DESCRIPTION)
+SKILLS_NUMBERED = """**Question 1**
+1. **Interview Question:** How would you find duplicate rows in a table?
+2. **Suggested Ideal Answer:** Group by the key columns and keep groups with more than one row.
+3. **Code Snippet (if applicable):**
+```sql
+SELECT email, COUNT(*) FROM users GROUP BY email HAVING COUNT(*) > 1;
+```
+4. **Evaluation and Justification:** Checks practical SQL for data cleaning.
+
+**Question 2:**
+1. **Interview Question:** How do you explain a complex analysis to a non-technical audience?
+2. **Suggested Ideal Answer:** Start from the decision it supports and use one clear chart.
+3. **Code Snippet (if applicable):** Not applicable.
+4. **Evaluation and Justification:** Checks communication with stakeholders.
+"""
+
+SKILLS_HEADINGS = """### Question 1
+1. **Interview Question:** How would you find duplicate rows in a table?
+2. **Suggested Ideal Answer:** Group by the key columns and keep groups with more than one row.
+4. **Evaluation and Justification:** Checks practical SQL for data cleaning.
+
+### Question 2
+1. **Interview Question:** How do you explain a complex analysis to a non-technical audience?
+2. **Suggested Ideal Answer:** Start from the decision it supports and use one clear chart.
+4. **Evaluation and Justification:** Checks communication with stakeholders.
+"""
+
+SKILLS_INLINE = """1. **Interview Question:** How would you find duplicate rows in a table?
+2. **Suggested Ideal Answer:** Group by the key columns and keep groups with more than one row.
+4. **Evaluation and Justification:** Checks practical SQL for data cleaning.
+
+1. **Interview Question:** How do you explain a complex analysis to a non-technical audience?
+2. **Suggested Ideal Answer:** Start from the decision it supports and use one clear chart.
+4. **Evaluation and Justification:** Checks communication with stakeholders.
+"""
+
+JOB_DESCRIPTION = """Question 1: How would you find duplicate rows in a table?
+Ideal Answer: Group by the key columns and keep groups with more than one row.
+Explanation: Checks practical SQL for data cleaning.
+
+Question 2: How do you explain a complex analysis to a non-technical audience?
+Ideal Answer: Start from the decision it supports and use one clear chart.
+Explanation: Checks communication with stakeholders.
+"""
+
+
+@pytest.mark.parametrize("text", [SKILLS_NUMBERED, SKILLS_HEADINGS, SKILLS_INLINE, JOB_DESCRIPTION])
+def test_template_layouts_count_one_boundary_per_question(text):
+    events = parse(text)
+    assert sum(1 for e in events if e.kind == QUESTION) == 2
+    assert len(split_questions(events)) == 2
+
+
+@pytest.mark.parametrize("text", [SKILLS_NUMBERED, SKILLS_HEADINGS, SKILLS_INLINE, JOB_DESCRIPTION])
+def test_router_accepts_valid_template_output(text):
+    request = model_router.RouteRequest(question_type="Behavioral", n=2, language="English")
+    assert model_router.check_text(text, request) == []
+
+
+def test_label_with_question_text_still_starts_each_question():
+    events = parse("**Question 1:** Why SQL?\nIdeal Answer: x\n**Question 2:** Why Python?\nIdeal Answer: y")
+    assert sum(1 for e in events if e.kind == QUESTION) == 2
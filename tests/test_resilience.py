@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+
+
+def test_streams_do_not_lower_the_hedge_threshold():
+    for _ in range(30):
+        resilience.call(lambda timeout: "first chunk", hedge=False, latency_key="test-stream-model")
+    calls = []
+
+    def slow(timeout):
+        calls.append(1)
+        time.sleep(0.05)
+        return "done"
+
+    assert resilience.call(slow, latency_key="test-stream-model") == "done"
+    assert len(calls) == 1
+    assert resilience.latency_tracker("test-stream-model").percentile(0.95) is None
+
+
+def test_latencies_are_tracked_per_model():
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        resilience.call(lambda timeout: "fast", latency_key="test-fast-model")
+    assert resilience.latency_tracker("test-fast-model").percentile(0.95) is not None
+    assert resilience.latency_tracker("test-slow-model").percentile(0.95) is None